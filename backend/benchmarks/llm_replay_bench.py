@@ -0,0 +1,83 @@
+"""Replay recorded LLM calls through the scheduling pipeline, offline and deterministically.
+
+Record first by running the API with LLM_RECORD_MODE=record, then:
+
+    python -m backend.benchmarks.llm_replay_bench [--latency zero|original] [--concurrency N] [--rounds N]
+
+Every recorded request goes through query_gemini_model (prompt building,
+router, replay provider), then through the same parsing and OutputSchema
+validation as POST /schedule. No network access or API keys are needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+async def run(main, requests, concurrency: int, rounds: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one(messages, temperature):
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await main.query_gemini_model({
+                    "messages": [{"role": "user", "parts": [{"text": text}]} for text in messages],
+                    "model": main.MODEL_NAME,
+                    "temperature": temperature,
+                })
+                items = json.loads(main.clean_response_text(response["response_text"]))
+                main.OutputSchema(schedule_id="bench", schedule=items)
+            except Exception as e:
+                failures += 1
+                print(f"failed: {e}")
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(messages, temperature) for _ in range(rounds) for messages, temperature in requests))
+    return time.perf_counter() - started, latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", choices=["zero", "original"], default="zero")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    # Configure before importing the app: replay only, throwaway DB, Redis is never contacted
+    os.environ["LLM_RECORD_MODE"] = "replay"
+    os.environ["LLM_REPLAY_LATENCY"] = args.latency
+    os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    os.environ["RETENTION_INTERVAL_SECONDS"] = "0"
+    from backend.core import main as app_main
+
+    unique = {}
+    for records in app_main.llm_store.records.values():
+        first = records[0]
+        if "messages" in first:
+            unique[first["fingerprint"]] = (first["messages"], first["temperature"])
+    if not unique:
+        print(f"No replayable recordings in {app_main.LLM_RECORD_PATH}")
+        return
+
+    elapsed, latencies, failures = asyncio.run(run(app_main, list(unique.values()), args.concurrency, args.rounds))
+    calls = len(latencies) + failures
+    print(f"{len(unique)} recorded requests x {args.rounds} rounds, latency={args.latency}, concurrency={args.concurrency}")
+    print(f"calls: {calls}  failures: {failures}  wall: {elapsed:.3f}s  throughput: {calls / elapsed:.1f}/s")
+    print(f"p50: {percentile(latencies, 0.5) * 1000:.2f} ms  p95: {percentile(latencies, 0.95) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare payload size and encode time of schedule responses.
+
+Run with: python -m backend.benchmarks.serialization_bench [weeks]
+"""
+import gzip
+import json
+import sys
+import timeit
+import uuid
+from datetime import date, timedelta
+
+from backend.services.serialization import (
+    COLUMNAR,
+    JSON,
+    MSGPACK,
+    available_formats,
+    compress,
+    encode_payload,
+)
+
+SESSIONS_PER_DAY = 14  # 7 Pomodoro sessions plus their breaks
+
+
+def build_payload(weeks: int) -> dict:
+    start = date.today()
+    items = []
+    for offset in range(weeks * 7):
+        day = start + timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+        for session in range(SESSIONS_PER_DAY):
+            minutes = 9 * 60 + session * 30
+            items.append({
+                "task_id": str(uuid.uuid4()),
+                "task_name": "Short Break" if session % 2 else f"Task {session // 2}",
+                "start_time": f"{minutes // 60:02d}:{minutes % 60:02d}",
+                "end_time": f"{(minutes + 25) // 60:02d}:{(minutes + 25) % 60:02d}",
+                "priority": "High" if session % 2 else "Medium",
+                "day": day.strftime("%A"),
+                "date": day.strftime("%Y-%m-%d"),
+                "notes": None,
+            })
+    return {"schedule_id": str(uuid.uuid4()), "schedule": items, "notes": None}
+
+
+def time_it(func, number: int = 50) -> float:
+    # Best of three runs, in milliseconds per call
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1000
+
+
+def main():
+    weeks = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    payload = build_payload(weeks)
+    print(f"{len(payload['schedule'])} sessions over {weeks} weeks")
+    print(f"{'variant':<32}{'bytes':>10}{'encode ms':>12}")
+
+    baseline = json.dumps(payload).encode()
+    print(f"{'stdlib json (current)':<32}{len(baseline):>10}{time_it(lambda: json.dumps(payload).encode()):>12.3f}")
+    print(f"{'stdlib json + gzip':<32}{len(gzip.compress(baseline)):>10}"
+          f"{time_it(lambda: gzip.compress(json.dumps(payload).encode())):>12.3f}")
+
+    names = {JSON: "json", COLUMNAR: "columnar", MSGPACK: "msgpack"}
+    for media_type in available_formats():
+        body = encode_payload(payload, media_type)
+        print(f"{names[media_type]:<32}{len(body):>10}{time_it(lambda: encode_payload(payload, media_type)):>12.3f}")
+        for encoding in ("gzip", "br"):
+            compressed, used = compress(body, encoding)
+            if used is None:
+                continue
+            label = f"{names[media_type]} + {used}"
+            encode = lambda: compress(encode_payload(payload, media_type), encoding)
+            print(f"{label:<32}{len(compressed):>10}{time_it(encode):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
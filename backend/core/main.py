@@ -1,5 +1,8 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import datetime, date, timedelta
 from typing import List, Optional, Dict, Any
@@ -7,16 +10,45 @@ from pydantic import BaseModel
 import json
 import os
 import uuid
+import math
+import time
+import secrets
+import socket
 import asyncio
-import google.generativeai as genai
+from email.utils import formatdate, parsedate_to_datetime
 from dotenv import load_dotenv
 import uvicorn
 import redis
+import redis.asyncio
 from telegram import Bot
 from fastapi.security import OAuth2PasswordRequestForm
-from backend.auth.auth import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, get_current_active_user
+from backend.auth.auth import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, get_current_active_user, get_current_user
 
 from backend.db.moudles import InputSchema, OutputSchema, ScheduleItem, Task, Schedule, SessionLocal
+from backend.db.moudles import RecurrenceRule, RecurrenceException, RecurrenceRuleSchema, RecurrenceRuleOut, OccurrenceEditSchema
+from backend.db.moudles import CalendarFeed, CalendarFeedOut, AvailabilityDay, ScheduleRevision
+from backend.db.moudles import BatchScheduleRequest, BatchScheduleResult, BatchScheduleOut
+from pydantic import ValidationError
+from backend.services.events import EventHub, TooManyConnections, event_stream, publish_event
+from backend.services.retention import archive_schedule, archived_items, archived_tasks, find_candidates, load_archived_payload
+from backend.services.availability import busy_mask, first_free_slot, free_busy, from_bytes, to_bytes, to_minute, to_hhmm
+from backend.services.ics import stream_calendar
+from backend.services.llm_router import LLMRouter, GeminiProvider, OpenAIProvider, AllProvidersFailed
+from backend.services.llm_recorder import RecordingStore, RecordingProvider, ReplayProvider
+from backend.services.rate_limit import RedisRateLimiter, InMemoryRateLimiter, LLMBudget, parse_rate
+from backend.services.serialization import (
+    JSON,
+    negotiate_format,
+    negotiate_encoding,
+    encode_payload,
+    compress,
+    loads,
+    variant_key,
+    all_variant_keys,
+)
+from backend.services.recurrence import expand_rules, is_hhmm, occurrence_dates, parse_window, WEEKDAYS, MAX_WINDOW_DAYS
+from heapq import merge
+from itertools import chain
 import backend.db.moudles as models
 
 app = FastAPI()
@@ -36,6 +68,7 @@ load_dotenv()
 
 # Get API keys and URLs from environment variables
 GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 REDIS_URL = os.getenv("REDIS_URL")
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
@@ -44,13 +77,45 @@ TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
 print(DATABASE_URL, GEMINI_API_KEY, REDIS_URL)
 
-if not GEMINI_API_KEY:
-    raise ValueError("GOOGLE_API_KEY environment variable not set")
+# LLM record/replay: "record" appends every answer to LLM_RECORD_PATH, "replay" answers only
+# from it (no network or keys needed) with the recorded latency or none (LLM_REPLAY_LATENCY)
+LLM_RECORD_MODE = os.getenv("LLM_RECORD_MODE", "off")
+LLM_RECORD_PATH = os.getenv("LLM_RECORD_PATH", "llm_recordings.jsonl")
+
+if not GEMINI_API_KEY and not OPENAI_API_KEY and LLM_RECORD_MODE != "replay":
+    raise ValueError("GOOGLE_API_KEY or OPENAI_API_KEY environment variable not set")
+
 
 
+MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+OPENAI_MODEL_NAME = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
-genai.configure(api_key=GEMINI_API_KEY)
-MODEL_NAME = "gemini-2.0-flash"
+# Helper function to strip markdown code fences the models like to wrap JSON in
+def clean_response_text(response_text: str) -> str:
+    return response_text.strip("```json").replace("```", "").strip()
+
+# A provider answer only counts if it is parseable JSON
+def is_json_response(response_text: str) -> bool:
+    try:
+        json.loads(clean_response_text(response_text))
+        return True
+    except json.JSONDecodeError:
+        return False
+
+# Every configured provider sits behind one router that picks the fastest healthy one,
+# hedges calls slower than its p95 and fails over on errors
+llm_providers = []
+if GEMINI_API_KEY:
+    llm_providers.append(GeminiProvider(MODEL_NAME, GEMINI_API_KEY))
+if OPENAI_API_KEY:
+    llm_providers.append(OpenAIProvider(OPENAI_MODEL_NAME, OPENAI_API_KEY, base_url=os.getenv("OPENAI_BASE_URL")))
+if LLM_RECORD_MODE == "record":
+    llm_store = RecordingStore(LLM_RECORD_PATH)
+    llm_providers = [RecordingProvider(provider, llm_store, validate=is_json_response) for provider in llm_providers]
+elif LLM_RECORD_MODE == "replay":
+    llm_store = RecordingStore(LLM_RECORD_PATH)
+    llm_providers = [ReplayProvider(llm_store, latency=os.getenv("LLM_REPLAY_LATENCY", "zero"))]
+llm_router = LLMRouter(llm_providers, hedge_delay=float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "8")))
 
 # Dependency to get the database session
 def get_db():
@@ -62,92 +127,317 @@ def get_db():
 
 redis_client = redis.Redis.from_url(REDIS_URL)
 
-# Helper function to cache data in Redis
-def cache_data(key: str, data: dict, expiration: int = 3600):
-    redis_client.setex(key, expiration, json.dumps(data))
+# Per-user, per-endpoint token buckets ("requests/seconds"); RATE_LIMIT_BACKEND=memory for tests
+RATE_LIMITS = {
+    "schedule:create": parse_rate(os.getenv("RATE_LIMIT_SCHEDULE_CREATE", "5/60")),
+    "schedule:read": parse_rate(os.getenv("RATE_LIMIT_SCHEDULE_READ", "120/60")),
+    "schedule:write": parse_rate(os.getenv("RATE_LIMIT_SCHEDULE_WRITE", "60/60")),
+    "schedule:batch": parse_rate(os.getenv("RATE_LIMIT_SCHEDULE_BATCH", "2/60")),
+    "llm:query": parse_rate(os.getenv("RATE_LIMIT_LLM_QUERY", "5/60")),
+}
+if os.getenv("RATE_LIMIT_BACKEND") == "memory":
+    rate_limiter = InMemoryRateLimiter()
+else:
+    rate_limiter = RedisRateLimiter(redis_client)
+
+# Push updates: one Redis pub/sub subscription per API worker, fanned out to SSE clients
+event_hub = EventHub(
+    redis_factory=lambda: redis.asyncio.Redis.from_url(REDIS_URL),
+    max_per_user=int(os.getenv("EVENTS_MAX_PER_USER", "5")),
+    max_connections=int(os.getenv("EVENTS_MAX_CONNECTIONS", "1000")),
+)
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_TICKET_TTL = int(os.getenv("EVENTS_TICKET_TTL_SECONDS", "30"))
+
+# Batch generation: at most BATCH_MAX_ITEMS inputs per request (and never more than the schedule:create
+# bucket holds), BATCH_CONCURRENCY LLM calls in flight
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "20"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "5"))
+
+# Retention: schedules fully in the past (or superseded by a regeneration) move to compressed archive rows
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "30"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "50"))
+RETENTION_INTERVAL = int(os.getenv("RETENTION_INTERVAL_SECONDS", "300"))  # 0 disables the job
+SUPERSEDED_GRACE = timedelta(hours=float(os.getenv("SUPERSEDED_GRACE_HOURS", "24")))
+
+# Daily LLM spend per user; a limit of 0 disables it
+llm_budget = LLMBudget(
+    rate_limiter,
+    daily_tokens=int(os.getenv("LLM_DAILY_TOKEN_BUDGET", "200000")),
+    daily_cost_usd=float(os.getenv("LLM_DAILY_COST_BUDGET_USD", "0.50")),
+    cost_per_1k_tokens_usd=float(os.getenv("LLM_COST_PER_1K_TOKENS_USD", "0.0004")),
+)
+
+def too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+# Dependency factory: authenticates the user and takes a token from their bucket for `endpoint`
+def rate_limited(endpoint: str):
+    capacity, rate = RATE_LIMITS[endpoint]
+
+    def dependency(current_user: models.User = Depends(get_current_active_user)):
+        retry_after = rate_limiter.take(f"{endpoint}:{current_user.id}", capacity, rate)
+        if retry_after > 0:
+            raise too_many_requests("Rate limit exceeded", retry_after)
+        return current_user
+
+    return dependency
+
+CACHE_EXPIRATION = 3600
+WORKER_NAME = f"{socket.gethostname()}-{os.getpid()}"
+
+# Helper function to cache pre-encoded bytes in Redis
+def cache_bytes(key: str, body: bytes, expiration: int = CACHE_EXPIRATION):
+    redis_client.setex(key, expiration, body)
+
+# Helper function to cache a schedule payload as the JSON bytes we serve
+def cache_data(key: str, data: dict, expiration: int = CACHE_EXPIRATION) -> bytes:
+    body = encode_payload(data, JSON)
+    cache_bytes(key, body, expiration)
+    return body
 
 # Helper function to get data from Redis cache
 def get_cached_data(key: str) -> Optional[dict]:
     cached_data = redis_client.get(key)
     if cached_data:
-        return json.loads(cached_data)
+        return loads(cached_data)
     return None
 
+# Helper function to drop every cached representation of a schedule
+def invalidate_schedule_cache(schedule_id: str):
+    redis_client.delete(*all_variant_keys(schedule_id))
+
+# Helper function to mark a user's calendar feed as changed (version in ms); feed polls compare
+# against this version in Redis so an unchanged feed is answered without touching the DB
+def touch_user_feed(user_id: str):
+    redis_client.set(f"feed_version:{user_id}", int(time.time() * 1000))
+
+def get_feed_version(user_id: str) -> int:
+    key = f"feed_version:{user_id}"
+    # Unknown version (e.g. after a Redis flush): start a new one so clients refetch once
+    redis_client.set(key, int(time.time() * 1000), nx=True)
+    return int(redis_client.get(key))
+
+# Helper function to answer with a negotiated (format, compression) variant of a schedule.
+# Every variant is encoded once and then served from Redis as raw bytes.
+def schedule_response(request: Request, schedule_id: str, load_payload) -> Response:
+    media_type = negotiate_format(request.headers.get("accept"))
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    plain_key = variant_key(schedule_id, media_type, None)
+    keys = [plain_key] if encoding is None else [variant_key(schedule_id, media_type, encoding), plain_key]
+    cached = redis_client.mget(keys)
+
+    used_encoding = None
+    if encoding is not None and cached[0] is not None:
+        body, used_encoding = cached[0], encoding
+    else:
+        body = cached[-1]
+        if body is None:
+            body = encode_payload(load_payload(), media_type)
+            cache_bytes(plain_key, body)
+        body, used_encoding = compress(body, encoding)
+        if used_encoding is not None:
+            cache_bytes(variant_key(schedule_id, media_type, used_encoding), body)
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if used_encoding is not None:
+        headers["Content-Encoding"] = used_encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
 # Helper function to send schedule to Telegram
 
 
+# Helper function to ask the LLM for the schedule items of one input; raises HTTPException(400) on bad output
+async def request_schedule_items(input_data: InputSchema, user_id: str) -> list:
+    # Update the prompt to explicitly request JSON format
+    gemini_input = {
+        "messages": [
+            {"role": "user", "parts": [{"text": f"Please create a task schedule that starting today based on the following input: {json.dumps(input_data.dict())}"}]},
+        ],
+        "model": MODEL_NAME,
+        "temperature": 1
+    }
+
+    # Call Gemini API to generate the schedule
+    gemini_response = await query_gemini_model(request=gemini_input)
+    llm_budget.record(user_id, gemini_response.get("total_tokens", 0))
+
+    response_text = gemini_response.get("response_text", None)
+    if not response_text:
+        raise HTTPException(status_code=400, detail="No response text received from Gemini.")
+
+    # Clean the response to remove any code block markdown
+    cleaned_response_text = clean_response_text(response_text)
+    try:
+        # Try to parse the cleaned response as JSON
+        schedule_items = json.loads(cleaned_response_text)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail=f"Failed to parse Gemini's response into valid JSON. Raw response: {cleaned_response_text}")
+
+    # Ensure that the returned schedule is valid
+    if not isinstance(schedule_items, list):
+        raise HTTPException(status_code=400, detail="Gemini's response does not contain a valid schedule.")
+    if not schedule_items:
+        # An empty schedule would be stored without tasks and 404 once its cache entry expires
+        raise HTTPException(status_code=400, detail="Gemini returned an empty schedule.")
+    if LLM_RECORD_MODE == "replay":
+        # Replayed answers repeat their task ids; give each run fresh primary keys
+        for item in schedule_items:
+            if isinstance(item, dict):
+                item["task_id"] = str(uuid.uuid4())
+    return schedule_items
+
+# Helper function to build the Task rows for generated items
+def schedule_rows(schedule_id: str, schedule_items: list) -> list:
+    rows = []
+    for task in schedule_items:
+        rows.append(Task(
+            id=task['task_id'],
+            schedule_id=schedule_id,
+            name=task["task_name"],
+            start_time=task["start_time"],
+            end_time=task["end_time"],
+            priority=task["priority"],
+            notes=task.get("notes"),
+            date=datetime.strptime(task["date"], "%Y-%m-%d").date(),
+        ))
+    return rows
+
 # POST endpoint to generate a schedule with Gemini handling task scheduling
 @app.post("/schedule", response_model=OutputSchema)
 async def generate_schedule(input_data: InputSchema,
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)):
-   
-    try:
-        # Update the prompt to explicitly request JSON format
-        gemini_input = {
-            "messages": [
-                {"role": "user", "parts": [{"text": f"Please create a task schedule that starting today based on the following input: {json.dumps(input_data.dict())}"}]},
-            ],
-            "model": MODEL_NAME,
-            "temperature": 1
-        }
-
-        # Call Gemini API to generate the schedule
-        gemini_response = await query_gemini_model(request=gemini_input)
-        
-        response_text = gemini_response.get("response_text", None)
-
-        if response_text:
-            # Clean the response to remove any code block markdown
-            cleaned_response_text = response_text.strip("```json").replace("```", "").strip()
-            # print(cleaned_response_text)
-            try:
-                # Try to parse the cleaned response as JSON
-                schedule_data = json.loads(cleaned_response_text)
-                schedule_data = {"schedule": schedule_data}
-            except json.JSONDecodeError:
-                raise HTTPException(status_code=400, detail=f"Failed to parse Gemini's response into valid JSON. Raw response: {cleaned_response_text}")
-
-            # Ensure that the returned schedule is valid
-            if "schedule" not in schedule_data:
-                raise HTTPException(status_code=400, detail="Gemini's response does not contain a valid schedule.")
-
-            # Save the generated schedule to the database
-            schedule_id = str(uuid.uuid4())
-            db_scheudle = Schedule(
-                id = schedule_id,
-                user_id = current_user.id
-            )
-            db.add(db_scheudle)
-            db.commit()
+    current_user: models.User = Depends(rate_limited("schedule:create")),
+    replaces: Optional[str] = None):
 
-            for task in schedule_data["schedule"]:
-                db_task = Task(
-                id=task['task_id'], 
-                schedule_id = schedule_id,
-                name=task["task_name"],
-                start_time=task["start_time"],
-                end_time=task["end_time"],
-                priority=task["priority"],
-                notes=task.get("notes"),
-                date=datetime.strptime(task["date"], "%Y-%m-%d").date(),
-                )
-                db.add(db_task)
-            db.commit()
-            cache_data(schedule_id, schedule_data)
+    retry_after = llm_budget.check(current_user.id)
+    if retry_after:
+        raise too_many_requests("Daily LLM budget exhausted", retry_after)
+    if replaces:
+        # Regenerating: the old schedule is marked superseded and archived by the retention job
+        get_owned_schedule(db, replaces, current_user.id)
 
-            return OutputSchema(schedule_id=schedule_id, schedule=schedule_data["schedule"], notes=schedule_data.get("notes", ""))
+    try:
+        schedule_items = await request_schedule_items(input_data, current_user.id)
 
+        # Save the generated schedule to the database
+        schedule_id = str(uuid.uuid4())
+        db.add(Schedule(id=schedule_id, user_id=current_user.id))
+        db.flush()  # the schedule row must exist before its tasks reference it
+        db.add_all(schedule_rows(schedule_id, schedule_items))
+        if replaces:
+            db.merge(ScheduleRevision(schedule_id=replaces, replaced_by=schedule_id, replaced_at=datetime.utcnow()))
+            # Recurring templates are the user's own routines, not LLM output: they carry over
+            db.query(RecurrenceRule).filter(RecurrenceRule.schedule_id == replaces).update(
+                {RecurrenceRule.schedule_id: schedule_id}, synchronize_session=False)
+        db.commit()
+        touch_user_feed(current_user.id)
+        if replaces:
+            publish_event(redis_client, current_user.id, "schedule.regenerated", schedule_id=schedule_id, replaces=replaces)
         else:
-            raise HTTPException(status_code=400, detail="No response text received from Gemini.")
+            publish_event(redis_client, current_user.id, "schedule.created", schedule_id=schedule_id)
+        if replaces:
+            invalidate_availability(db, current_user.id, date.today())
+        rebuild_availability(db, current_user.id,
+                             {datetime.strptime(task["date"], "%Y-%m-%d").date() for task in schedule_items})
+
+        output = OutputSchema(schedule_id=schedule_id, schedule=schedule_items, notes="")
+        payload = output.model_dump()
+        cache_data(schedule_id, payload)
+
+        return schedule_response(request, schedule_id, lambda: payload)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Scheduling failed: {str(e)}")
 
+# POST endpoint to generate many schedules (e.g. a whole team) in one call.
+# LLM calls run concurrently (bounded by BATCH_CONCURRENCY) and every result is saved in one transaction.
+@app.post("/schedules/batch", response_model=BatchScheduleOut)
+async def generate_schedules_batch(batch: BatchScheduleRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(rate_limited("schedule:batch"))):
+
+    # Every input is one LLM call, so the batch is charged against the same bucket as POST /schedule
+    capacity, rate = RATE_LIMITS["schedule:create"]
+    max_items = min(BATCH_MAX_ITEMS, capacity)
+    if not batch.schedules:
+        raise HTTPException(status_code=400, detail="No schedules requested")
+    if len(batch.schedules) > max_items:
+        raise HTTPException(status_code=400, detail=f"At most {max_items} schedules per batch")
+    retry_after = llm_budget.check(current_user.id)
+    if retry_after:
+        raise too_many_requests("Daily LLM budget exhausted", retry_after)
+    retry_after = rate_limiter.take(f"schedule:create:{current_user.id}", capacity, rate, cost=len(batch.schedules))
+    if retry_after > 0:
+        raise too_many_requests("Rate limit exceeded", retry_after)
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def generate_one(input_data: InputSchema):
+        async with semaphore:
+            # Earlier items of this batch may have used up the budget
+            retry_after = llm_budget.check(current_user.id)
+            if retry_after:
+                raise too_many_requests("Daily LLM budget exhausted", retry_after)
+            return await request_schedule_items(input_data, current_user.id)
+
+    outcomes = await asyncio.gather(*(generate_one(input_data) for input_data in batch.schedules),
+                                    return_exceptions=True)
+
+    results = []
+    schedules = []
+    rows = []
+    payloads = {}
+    seen_task_ids = set()
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome, BaseException):
+            error = outcome.detail if isinstance(outcome, HTTPException) else str(outcome)
+            results.append(BatchScheduleResult(index=index, status="error", error=error))
+            continue
+        schedule_id = str(uuid.uuid4())
+        try:
+            output = OutputSchema(schedule_id=schedule_id, schedule=outcome, notes="")
+            for item in output.schedule:
+                # One duplicate primary key would abort the whole bulk insert
+                if item.task_id in seen_task_ids:
+                    item.task_id = str(uuid.uuid4())
+                seen_task_ids.add(item.task_id)
+            payload = output.model_dump()
+            item_rows = schedule_rows(schedule_id, payload["schedule"])
+        except (ValidationError, ValueError) as e:
+            results.append(BatchScheduleResult(index=index, status="error", error=f"Invalid schedule: {e}"))
+            continue
+        schedules.append(Schedule(id=schedule_id, user_id=current_user.id))
+        rows.extend(item_rows)
+        payloads[schedule_id] = payload
+        results.append(BatchScheduleResult(index=index, status="ok", schedule_id=schedule_id, schedule=output.schedule))
+
+    if schedules:
+        try:
+            db.add_all(schedules)
+            db.flush()  # schedule rows must exist before their tasks reference them
+            db.add_all(rows)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"Saving schedules failed: {str(e)}")
+
+        touch_user_feed(current_user.id)
+        rebuild_availability(db, current_user.id, {row.date for row in rows})
+        for schedule_id in payloads:
+            publish_event(redis_client, current_user.id, "schedule.created", schedule_id=schedule_id)
+        pipe = redis_client.pipeline()
+        for schedule_id, payload in payloads.items():
+            pipe.setex(schedule_id, CACHE_EXPIRATION, encode_payload(payload, JSON))
+        pipe.execute()
+
+    return BatchScheduleOut(results=results)
+
 # PUT endpoint to update a task in the schedule
 @app.put("/schedule/{schedule_id}/task/{task_id}")
 async def update_task(schedule_id: str, task_id: str, updated_task: ScheduleItem, db: Session = Depends(get_db),
-                      current_user=Depends(get_current_active_user)):
+                      current_user=Depends(rate_limited("schedule:write"))):
     task = db.query(Task).filter(
         Task.id == task_id,
         Task.schedule_id == schedule_id,
@@ -162,39 +452,559 @@ async def update_task(schedule_id: str, task_id: str, updated_task: ScheduleItem
     task.priority = updated_task.priority
     task.notes = updated_task.notes
     db.commit()
+    invalidate_schedule_cache(schedule_id)
+    owner_id = db.query(Schedule.user_id).filter(Schedule.id == schedule_id).scalar()
+    touch_user_feed(owner_id)
+    rebuild_availability(db, owner_id, [task.date])
+    publish_event(redis_client, owner_id, "task.updated", schedule_id=schedule_id, task_id=task_id)
 
     return {"message": "Task updated", "updated_task": updated_task}
 
 # GET endpoint to fetch the schedule by ID
 @app.get("/schedule/{schedule_id}", response_model=OutputSchema)
-async def get_schedule(schedule_id: str, db: Session = Depends(get_db), current_user=Depends(get_current_active_user)):
-    cached_schedule = get_cached_data(schedule_id)
-    if cached_schedule:
-        return OutputSchema(schedule_id=schedule_id, schedule=cached_schedule["schedule"], notes=cached_schedule.get("notes"))
+async def get_schedule(schedule_id: str, request: Request, db: Session = Depends(get_db),
+                       current_user=Depends(rate_limited("schedule:read"))):
+    def load_payload() -> dict:
+        # Other formats are derived from the cached JSON so the DB is read at most once
+        cached_schedule = get_cached_data(schedule_id)
+        if cached_schedule:
+            return cached_schedule
+
+        tasks = db.query(Task).filter(
+            Task.schedule_id == schedule_id,
+        ).all()
+        if not tasks:
+            # Archived schedules live in one compressed row instead of the tasks table
+            archived = load_archived_payload(db, schedule_id)
+            if not archived:
+                raise HTTPException(status_code=404, detail="Schedule not found")
+            cache_data(schedule_id, archived)
+            return archived
+
+        schedule = [ScheduleItem(
+            task_id=task.id,
+            task_name=task.name,
+            start_time=task.start_time,
+            end_time=task.end_time,
+            priority=task.priority,
+            day=task.date.strftime("%A"),
+            date=task.date.strftime("%Y-%m-%d"),
+            notes=task.notes
+        ) for task in tasks]
+
+        payload = OutputSchema(schedule_id=schedule_id, schedule=schedule, notes=None).model_dump()
+        cache_data(schedule_id, payload)
+        return payload
+
+    return schedule_response(request, schedule_id, load_payload)
+
+# Helper function to load a schedule and make sure it belongs to the current user
+def get_owned_schedule(db: Session, schedule_id: str, user_id: str) -> Schedule:
+    schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
+    if not schedule or schedule.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return schedule
+
+def rule_to_out(rule: RecurrenceRule) -> RecurrenceRuleOut:
+    return RecurrenceRuleOut(
+        rule_id=rule.id,
+        schedule_id=rule.schedule_id,
+        task_name=rule.name,
+        start_time=rule.start_time,
+        end_time=rule.end_time,
+        priority=rule.priority,
+        notes=rule.notes,
+        frequency=rule.frequency,
+        interval=rule.interval,
+        weekdays=rule.weekdays.split(",") if rule.weekdays else None,
+        start_date=rule.start_date.strftime("%Y-%m-%d"),
+        end_date=rule.end_date.strftime("%Y-%m-%d") if rule.end_date else None,
+    )
+
+# Helper function to validate a recurring template and copy it onto a rule row
+def apply_rule_data(rule: RecurrenceRule, rule_data: RecurrenceRuleSchema):
+    if rule_data.frequency not in ("daily", "weekly"):
+        raise HTTPException(status_code=400, detail="frequency must be 'daily' or 'weekly'")
+    if rule_data.interval < 1:
+        raise HTTPException(status_code=400, detail="interval must be at least 1")
+    if not is_hhmm(rule_data.start_time) or not is_hhmm(rule_data.end_time):
+        raise HTTPException(status_code=400, detail="Times must be in HH:MM format")
+    weekdays = [day.capitalize() for day in rule_data.weekdays or []]
+    if any(day not in WEEKDAYS for day in weekdays):
+        raise HTTPException(status_code=400, detail=f"weekdays must be in {WEEKDAYS}")
+    try:
+        start_date = datetime.strptime(rule_data.start_date, "%Y-%m-%d").date()
+        end_date = datetime.strptime(rule_data.end_date, "%Y-%m-%d").date() if rule_data.end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+    if end_date is not None and end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    rule.name = rule_data.task_name
+    rule.start_time = rule_data.start_time
+    rule.end_time = rule_data.end_time
+    rule.priority = rule_data.priority
+    rule.notes = rule_data.notes
+    rule.frequency = rule_data.frequency
+    rule.interval = rule_data.interval
+    rule.weekdays = ",".join(weekdays) or None
+    rule.start_date = start_date
+    rule.end_date = end_date
+
+# Helper function to load one recurrence rule of a schedule
+def get_schedule_rule(db: Session, schedule_id: str, rule_id: str) -> RecurrenceRule:
+    rule = db.query(RecurrenceRule).filter(
+        RecurrenceRule.id == rule_id,
+        RecurrenceRule.schedule_id == schedule_id,
+    ).first()
+    if not rule:
+        raise HTTPException(status_code=404, detail="Recurrence rule not found")
+    return rule
+
+# POST endpoint to attach a recurring task template to a schedule
+@app.post("/schedule/{schedule_id}/recurrence", response_model=RecurrenceRuleOut)
+async def create_recurrence_rule(schedule_id: str, rule_data: RecurrenceRuleSchema, db: Session = Depends(get_db),
+                                 current_user=Depends(get_current_active_user)):
+    get_owned_schedule(db, schedule_id, current_user.id)
+    rule = RecurrenceRule(id=str(uuid.uuid4()), schedule_id=schedule_id)
+    apply_rule_data(rule, rule_data)
+    start_date, end_date = rule.start_date, rule.end_date
+    db.add(rule)
+    db.commit()
+    touch_user_feed(current_user.id)
+    invalidate_availability(db, current_user.id, start_date, end_date)
+    publish_event(redis_client, current_user.id, "schedule.updated", schedule_id=schedule_id)
+    db.refresh(rule)
+    return rule_to_out(rule)
+
+# GET endpoint to list the recurring templates of a schedule
+@app.get("/schedule/{schedule_id}/recurrence", response_model=List[RecurrenceRuleOut])
+async def list_recurrence_rules(schedule_id: str, db: Session = Depends(get_db),
+                                current_user=Depends(get_current_active_user)):
+    get_owned_schedule(db, schedule_id, current_user.id)
+    rules = db.query(RecurrenceRule).filter(RecurrenceRule.schedule_id == schedule_id).all()
+    return [rule_to_out(rule) for rule in rules]
+
+# PUT endpoint to change a recurring template as a whole (e.g. move it, or end it with end_date)
+@app.put("/schedule/{schedule_id}/recurrence/{rule_id}", response_model=RecurrenceRuleOut)
+async def update_recurrence_rule(schedule_id: str, rule_id: str, rule_data: RecurrenceRuleSchema,
+                                 db: Session = Depends(get_db), current_user=Depends(get_current_active_user)):
+    get_owned_schedule(db, schedule_id, current_user.id)
+    rule = get_schedule_rule(db, schedule_id, rule_id)
+    old_start, old_end = rule.start_date, rule.end_date
+    apply_rule_data(rule, rule_data)
+    db.commit()
+    touch_user_feed(current_user.id)
+    # Both the old and the new span may have changed occupancy
+    end_date = None if old_end is None or rule.end_date is None else max(old_end, rule.end_date)
+    invalidate_availability(db, current_user.id, min(old_start, rule.start_date), end_date)
+    publish_event(redis_client, current_user.id, "schedule.updated", schedule_id=schedule_id)
+    db.refresh(rule)
+    return rule_to_out(rule)
+
+# DELETE endpoint to remove a recurring template together with its edited occurrences
+@app.delete("/schedule/{schedule_id}/recurrence/{rule_id}")
+async def delete_recurrence_rule(schedule_id: str, rule_id: str, db: Session = Depends(get_db),
+                                 current_user=Depends(get_current_active_user)):
+    get_owned_schedule(db, schedule_id, current_user.id)
+    rule = get_schedule_rule(db, schedule_id, rule_id)
+    start_date, end_date = rule.start_date, rule.end_date
+    db.query(RecurrenceException).filter(RecurrenceException.rule_id == rule_id).delete(synchronize_session=False)
+    db.delete(rule)
+    db.commit()
+    touch_user_feed(current_user.id)
+    invalidate_availability(db, current_user.id, start_date, end_date)
+    publish_event(redis_client, current_user.id, "schedule.updated", schedule_id=schedule_id)
+    return {"message": "Recurrence rule deleted", "rule_id": rule_id}
+
+# PUT endpoint to edit or cancel a single occurrence; only the exception is stored
+@app.put("/schedule/{schedule_id}/recurrence/{rule_id}/occurrence/{occurrence_date}")
+async def edit_occurrence(schedule_id: str, rule_id: str, occurrence_date: str, edit: OccurrenceEditSchema,
+                          db: Session = Depends(get_db), current_user=Depends(get_current_active_user)):
+    get_owned_schedule(db, schedule_id, current_user.id)
+    rule = get_schedule_rule(db, schedule_id, rule_id)
+    try:
+        day = datetime.strptime(occurrence_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+    if any(value is not None and not is_hhmm(value) for value in (edit.start_time, edit.end_time)):
+        raise HTTPException(status_code=400, detail="Times must be in HH:MM format")
+
+    exception = db.query(RecurrenceException).filter(
+        RecurrenceException.rule_id == rule_id,
+        RecurrenceException.date == day,
+    ).first()
+    if not exception:
+        if next(occurrence_dates(rule, day, day), None) is None:
+            raise HTTPException(status_code=404, detail="Rule has no occurrence on that date")
+        exception = RecurrenceException(id=str(uuid.uuid4()), rule_id=rule_id, date=day)
+        db.add(exception)
+    exception.cancelled = edit.cancelled
+    exception.name = edit.task_name
+    exception.start_time = edit.start_time
+    exception.end_time = edit.end_time
+    exception.priority = edit.priority
+    exception.notes = edit.notes
+    db.commit()
+    touch_user_feed(current_user.id)
+    rebuild_availability(db, current_user.id, [day])
+    publish_event(redis_client, current_user.id, "schedule.updated", schedule_id=schedule_id)
+
+    return {"message": "Occurrence updated", "date": occurrence_date, "cancelled": edit.cancelled}
+
+# Helper function to load the recurrence rules (of one schedule or all of a user's schedules)
+# active in a window, plus their exceptions keyed by (rule_id, date)
+def load_recurrences(db: Session, window_start: date, window_end: date,
+                     schedule_id: Optional[str] = None, user_id: Optional[str] = None):
+    query = db.query(RecurrenceRule).filter(RecurrenceRule.start_date <= window_end)
+    if schedule_id is not None:
+        query = query.filter(RecurrenceRule.schedule_id == schedule_id)
+    if user_id is not None:
+        query = query.join(Schedule, RecurrenceRule.schedule_id == Schedule.id).filter(Schedule.user_id == user_id)
+    rules = [rule for rule in query.all() if rule.end_date is None or rule.end_date >= window_start]
+    exceptions = {}
+    if rules:
+        rows = db.query(RecurrenceException).filter(
+            RecurrenceException.rule_id.in_([rule.id for rule in rules]),
+            RecurrenceException.date >= window_start,
+            RecurrenceException.date <= window_end,
+        ).all()
+        exceptions = {(row.rule_id, row.date): row for row in rows}
+    return rules, exceptions
+
+# Helper function to stream a windowed schedule as JSON without building the full list
+def stream_schedule_json(schedule_id: str, items):
+    yield '{"schedule_id": ' + json.dumps(schedule_id) + ', "schedule": ['
+    for index, item in enumerate(items):
+        yield ("," if index else "") + json.dumps(item)
+    yield '], "notes": null}'
+
+# GET endpoint to read a schedule for a date window, expanding recurring tasks on the fly
+@app.get("/schedule/{schedule_id}/occurrences", response_model=OutputSchema)
+async def get_schedule_window(schedule_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                              db: Session = Depends(get_db), current_user=Depends(rate_limited("schedule:read"))):
+    get_owned_schedule(db, schedule_id, current_user.id)
+    try:
+        window_start, window_end = parse_window(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rules, exceptions = load_recurrences(db, window_start, window_end, schedule_id=schedule_id)
 
     tasks = db.query(Task).filter(
         Task.schedule_id == schedule_id,
+        Task.date >= window_start,
+        Task.date <= window_end,
+    ).order_by(Task.date, Task.start_time).all()
+    stored = ({
+        "task_id": task.id,
+        "task_name": task.name,
+        "start_time": task.start_time,
+        "end_time": task.end_time,
+        "priority": task.priority,
+        "day": task.date.strftime("%A"),
+        "date": task.date.strftime("%Y-%m-%d"),
+        "notes": task.notes,
+    } for task in tasks)
+    # Tasks moved to cold storage by the retention job still belong to the window
+    archived = archived_items(db, schedule_id, window_start, window_end)
+
+    items = merge(stored, archived, expand_rules(rules, window_start, window_end, exceptions),
+                  key=lambda item: (item["date"], item["start_time"]))
+    return StreamingResponse(stream_schedule_json(schedule_id, items), media_type="application/json")
+
+# Helper function to recompute the occupancy bitmaps of some of a user's days from their
+# tasks and recurring occurrences, and store them
+def rebuild_availability(db: Session, user_id: str, days) -> Dict[date, int]:
+    days = sorted(set(days))
+    if not days:
+        return {}
+    intervals = {day: [] for day in days}
+    tasks = db.query(Task.date, Task.start_time, Task.end_time).join(Schedule, Task.schedule_id == Schedule.id).filter(
+        Schedule.user_id == user_id,
+        Task.date.in_(days),
+        # A replaced schedule stops blocking time right away, not only once it is archived
+        ~Task.schedule_id.in_(db.query(ScheduleRevision.schedule_id)),
     ).all()
-    if not tasks:
-        raise HTTPException(status_code=404, detail="Schedule not found")
+    for task in tasks:
+        intervals[task.date].append((task.start_time, task.end_time))
+    rules, exceptions = load_recurrences(db, days[0], days[-1], user_id=user_id)
+    for item in expand_rules(rules, days[0], days[-1], exceptions):
+        day = datetime.strptime(item["date"], "%Y-%m-%d").date()
+        if day in intervals:
+            intervals[day].append((item["start_time"], item["end_time"]))
 
-    schedule = [ScheduleItem(
-        task_id=task.id,
-        task_name=task.name,
-        start_time=task.start_time,
-        end_time=task.end_time,
-        priority=task.priority,
-        day=task.date.strftime("%A"),
-        date=task.date.strftime("%Y-%m-%d"),
-        notes=task.notes
-    ) for task in tasks]
+    masks = {day: busy_mask(intervals[day]) for day in days}
+    for attempt in range(2):
+        existing = {row.date: row for row in db.query(AvailabilityDay).filter(
+            AvailabilityDay.user_id == user_id,
+            AvailabilityDay.date.in_(days),
+        ).all()}
+        for day, mask in masks.items():
+            if day in existing:
+                existing[day].busy = to_bytes(mask)
+            else:
+                db.add(AvailabilityDay(user_id=user_id, date=day, busy=to_bytes(mask)))
+        try:
+            db.commit()
+            break
+        except IntegrityError:
+            # A concurrent rebuild inserted one of these days first; update its row instead
+            db.rollback()
+            if attempt:
+                raise
+    return masks
 
-    cache_data(schedule_id,  {"schedule": [item.model_dump() for item in schedule]})
+# Helper function to drop index rows that a recurrence change made stale; they are rebuilt on next read
+def invalidate_availability(db: Session, user_id: str, start_date: date, end_date: Optional[date] = None):
+    query = db.query(AvailabilityDay).filter(AvailabilityDay.user_id == user_id, AvailabilityDay.date >= start_date)
+    if end_date is not None:
+        query = query.filter(AvailabilityDay.date <= end_date)
+    query.delete(synchronize_session=False)
+    db.commit()
 
-    return OutputSchema(schedule_id=schedule_id, schedule=schedule, notes=None)
+# Helper function to read the busy bitmaps of [start, end], building any day that isn't indexed yet
+def load_availability(db: Session, user_id: str, start: date, end: date) -> Dict[date, int]:
+    rows = db.query(AvailabilityDay).filter(
+        AvailabilityDay.user_id == user_id,
+        AvailabilityDay.date >= start,
+        AvailabilityDay.date <= end,
+    ).all()
+    masks = {row.date: from_bytes(row.busy) for row in rows}
+    missing = [start + timedelta(days=offset) for offset in range((end - start).days + 1)
+               if start + timedelta(days=offset) not in masks]
+    if missing:
+        masks.update(rebuild_availability(db, user_id, missing))
+    return masks
 
-# Function to query Gemini model
-@app.post("/gemini/query")
+def parse_working_hours(working_start: str, working_end: str):
+    try:
+        window_start, window_end = to_minute(working_start), to_minute(working_end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Working hours must be in HH:MM format")
+    if window_end <= window_start:
+        raise HTTPException(status_code=400, detail="working_end must be after working_start")
+    return window_start, window_end
+
+# GET endpoint returning free/busy intervals within working hours for a date range
+@app.get("/availability")
+async def get_availability(start: Optional[str] = None, end: Optional[str] = None,
+                           working_start: str = "09:00", working_end: str = "17:00",
+                           db: Session = Depends(get_db), current_user=Depends(rate_limited("schedule:read"))):
+    try:
+        window_start, window_end = parse_window(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    day_start, day_end = parse_working_hours(working_start, working_end)
+
+    masks = load_availability(db, current_user.id, window_start, window_end)
+    return {"days": [
+        {"date": day.strftime("%Y-%m-%d"), "day": day.strftime("%A"), **free_busy(masks[day], day_start, day_end)}
+        for day in sorted(masks)
+    ]}
+
+# GET endpoint finding the next free slot of `duration` minutes within working hours
+@app.get("/availability/next-slot")
+async def get_next_free_slot(duration: int = 25, after: Optional[str] = None,
+                             working_start: str = "09:00", working_end: str = "17:00",
+                             working_days: Optional[str] = None, horizon_days: int = 30,
+                             db: Session = Depends(get_db), current_user=Depends(rate_limited("schedule:read"))):
+    day_start, day_end = parse_working_hours(working_start, working_end)
+    if not 0 < duration <= day_end - day_start:
+        raise HTTPException(status_code=400, detail="duration must fit inside working hours")
+    if not 0 < horizon_days <= MAX_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"horizon_days must be between 1 and {MAX_WINDOW_DAYS}")
+    try:
+        not_before = datetime.strptime(after, "%Y-%m-%dT%H:%M") if after else datetime.now()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="after must be in YYYY-MM-DDTHH:MM format")
+    allowed_days = {day.strip().capitalize() for day in working_days.split(",")} if working_days else set(WEEKDAYS)
+
+    first_day = not_before.date()
+    masks = load_availability(db, current_user.id, first_day, first_day + timedelta(days=horizon_days - 1))
+    for day in sorted(masks):
+        if day.strftime("%A") not in allowed_days:
+            continue
+        window_start = day_start
+        if day == first_day:
+            window_start = max(day_start, not_before.hour * 60 + not_before.minute)
+        start_minute = first_free_slot(masks[day], duration, window_start, day_end)
+        if start_minute is not None:
+            return {
+                "date": day.strftime("%Y-%m-%d"),
+                "day": day.strftime("%A"),
+                "start_time": to_hhmm(start_minute),
+                "end_time": to_hhmm(start_minute + duration),
+            }
+    raise HTTPException(status_code=404, detail="No free slot found within the horizon")
+
+# POST endpoint issuing a short-lived, single-use ticket for opening the event stream. EventSource
+# can't send headers, and a bearer token in the URL would end up in access logs.
+@app.post("/events/ticket")
+async def create_events_ticket(current_user=Depends(get_current_active_user)):
+    ticket = secrets.token_urlsafe(32)
+    redis_client.setex(f"events_ticket:{ticket}", EVENTS_TICKET_TTL, current_user.id)
+    return {"ticket": ticket, "expires_in": EVENTS_TICKET_TTL}
+
+# Helper function to trade a ticket for its user id; GETDEL makes every ticket single-use
+def redeem_events_ticket(ticket: str) -> Optional[str]:
+    user_id = redis_client.getdel(f"events_ticket:{ticket}")
+    return user_id.decode() if user_id else None
+
+# GET endpoint streaming schedule-change events (Server-Sent Events) to the dashboard
+@app.get("/events")
+async def schedule_events(request: Request, ticket: Optional[str] = None, db: Session = Depends(get_db)):
+    if ticket:
+        user_id = redeem_events_ticket(ticket)
+        current_user = db.query(models.User).filter(models.User.id == user_id).first() if user_id else None
+        if current_user is None:
+            raise HTTPException(status_code=401, detail="Invalid or expired ticket")
+        current_user = get_current_active_user(current_user)
+    else:
+        # Non-browser clients can still send their bearer token as a header
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+        current_user = get_current_active_user(get_current_user(token=token, db=db))
+
+    try:
+        subscription = event_hub.subscribe(current_user.id)
+    except TooManyConnections as e:
+        raise too_many_requests(str(e), EVENTS_HEARTBEAT)
+
+    return StreamingResponse(
+        event_stream(event_hub, subscription, request.is_disconnected, heartbeat=EVENTS_HEARTBEAT),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# POST endpoint to create (or rotate) the secret ICS feed URL of the current user
+@app.post("/calendar/feed", response_model=CalendarFeedOut)
+async def create_calendar_feed(request: Request, db: Session = Depends(get_db),
+                               current_user=Depends(get_current_active_user)):
+    existing = db.query(CalendarFeed).filter(CalendarFeed.user_id == current_user.id).first()
+    if existing:
+        redis_client.delete(f"feed_token:{existing.token}")
+        db.delete(existing)
+        db.flush()
+    feed = CalendarFeed(token=secrets.token_urlsafe(32), user_id=current_user.id)
+    db.add(feed)
+    db.commit()
+    return CalendarFeedOut(feed_url=str(request.url_for("get_calendar_feed", feed_token=feed.token)))
+
+# Helper function to map a feed token to its user, hitting the DB only on a cold cache
+def resolve_feed_token(feed_token: str) -> Optional[str]:
+    cached_user_id = redis_client.get(f"feed_token:{feed_token}")
+    if cached_user_id:
+        return cached_user_id.decode()
+    db = SessionLocal()
+    try:
+        feed = db.query(CalendarFeed).filter(CalendarFeed.token == feed_token).first()
+    finally:
+        db.close()
+    if not feed:
+        return None
+    redis_client.setex(f"feed_token:{feed_token}", CACHE_EXPIRATION, feed.user_id)
+    return feed.user_id
+
+# Helper function to decide whether a conditional GET can be answered with 304
+def feed_not_modified(request: Request, etag: str, version: int) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(if_modified_since).timestamp() >= version // 1000
+        except (TypeError, ValueError):
+            return False
+    return False
+
+# Generator that streams the feed from its own session, since the request's
+# session is already closed by the time the response body is sent
+def stream_user_calendar(user_id: str, version: int):
+    db = SessionLocal()
+    try:
+        rules = db.query(RecurrenceRule).join(Schedule, RecurrenceRule.schedule_id == Schedule.id).filter(
+            Schedule.user_id == user_id,
+        ).all()
+        exceptions = {}
+        if rules:
+            for row in db.query(RecurrenceException).filter(
+                RecurrenceException.rule_id.in_([rule.id for rule in rules]),
+            ).all():
+                exceptions.setdefault(row.rule_id, []).append(row)
+        tasks = db.query(Task).join(Schedule, Task.schedule_id == Schedule.id).outerjoin(
+            ScheduleRevision, ScheduleRevision.schedule_id == Task.schedule_id,
+        ).filter(
+            Schedule.user_id == user_id,
+            # A replaced schedule only keeps its days before the replacement, as its archive will
+            or_(ScheduleRevision.schedule_id.is_(None), Task.date < func.date(ScheduleRevision.replaced_at)),
+        ).order_by(Task.date, Task.start_time).yield_per(500)
+        # Archived schedules stay in the feed so past events don't vanish from users' calendars
+        yield from stream_calendar(chain(tasks, archived_tasks(db, user_id)), rules, exceptions,
+                                   datetime.utcfromtimestamp(version / 1000))
+    finally:
+        db.close()
+
+# GET endpoint serving the user's schedule as an iCalendar feed for calendar apps
+@app.get("/calendar/{feed_token}.ics")
+async def get_calendar_feed(feed_token: str, request: Request):
+    user_id = resolve_feed_token(feed_token)
+    if not user_id:
+        raise HTTPException(status_code=404, detail="Calendar feed not found")
+
+    version = get_feed_version(user_id)
+    etag = f'"{user_id}-{version}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(version / 1000, usegmt=True),
+        "Cache-Control": "private, max-age=60",
+    }
+    if feed_not_modified(request, etag, version):
+        return Response(status_code=304, headers=headers)
+
+    return StreamingResponse(stream_user_calendar(user_id, version),
+                             media_type="text/calendar; charset=utf-8", headers=headers)
+
+# Archive one batch of cold schedules. The Redis lock is left to expire so that across all
+# API workers at most one batch runs per interval.
+def run_retention_batch() -> int:
+    if not redis_client.set("retention:lock", WORKER_NAME, nx=True, ex=RETENTION_INTERVAL):
+        return 0
+    db = SessionLocal()
+    try:
+        archived = 0
+        for schedule_id in find_candidates(db, RETENTION_DAYS, SUPERSEDED_GRACE, RETENTION_BATCH_SIZE):
+            archive = archive_schedule(db, schedule_id)
+            if not archive:
+                continue
+            archived += 1
+            touch_user_feed(archive.user_id)
+            if archive.last_date >= date.today():
+                # A superseded schedule no longer blocks its future time slots
+                invalidate_availability(db, archive.user_id, date.today(), archive.last_date)
+        return archived
+    finally:
+        db.close()
+
+async def retention_loop():
+    """Periodically move cold schedules out of the hot tasks table, a small batch at a time."""
+    while True:
+        try:
+            archived = await asyncio.to_thread(run_retention_batch)
+            if archived:
+                print(f"Archived {archived} schedules")
+        except Exception as e:
+            print(f"Error in retention job: {e}")
+        await asyncio.sleep(RETENTION_INTERVAL)
+
+@app.on_event("startup")
+async def start_retention_service():
+    if RETENTION_INTERVAL > 0:
+        asyncio.create_task(retention_loop())
+
+# Function to query the LLM providers; callers are responsible for limits and budgets
 async def query_gemini_model(request: Dict[str, Any]) -> Dict[str, Any]:
     MAX_RETRIES = 3
     RETRY_DELAY = 5  # seconds
@@ -282,27 +1092,35 @@ For a task with X total minutes:
 
 
 
-    model = genai.GenerativeModel(request["model"], system_instruction=system_instruction)
+    messages = [message['parts'][0]['text'] for message in request["messages"]]
 
     for attempt in range(MAX_RETRIES):
         try:
-            messages = [{'role': 'user', 'parts': [{'text': message['parts'][0]['text']}]} for message in request["messages"]]
-
-            response = model.generate_content(messages, generation_config={"temperature": request["temperature"]})
-
-            if response.text:
-                return {"response_text": response.text}
-            else:
-                print("Failed to process the model response.")
-                return {}
+            return await llm_router.generate(system_instruction, messages, request["temperature"],
+                                             validate=is_json_response)
 
-        except Exception as e:
+        except AllProvidersFailed as e:
             if attempt < MAX_RETRIES - 1:
                 await asyncio.sleep(RETRY_DELAY)
             else:
-                raise HTTPException(status_code=500, detail=f"Failed to query Gemini API: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Failed to query LLM providers: {str(e)}")
+
+    raise HTTPException(status_code=500, detail="Failed to query LLM providers after multiple retries")
+
+# POST endpoint for raw LLM queries, under the same per-user limits and daily budget as schedule generation
+@app.post("/gemini/query")
+async def gemini_query(request: Dict[str, Any], current_user=Depends(rate_limited("llm:query"))) -> Dict[str, Any]:
+    retry_after = llm_budget.check(current_user.id)
+    if retry_after:
+        raise too_many_requests("Daily LLM budget exhausted", retry_after)
+    response = await query_gemini_model(request)
+    llm_budget.record(current_user.id, response.get("total_tokens", 0))
+    return response
 
-    raise HTTPException(status_code=500, detail="Failed to query Gemini API after multiple retries")
+# GET endpoint exposing rolling latency and health of each LLM provider
+@app.get("/llm/providers")
+async def llm_provider_stats(current_user=Depends(get_current_active_user)):
+    return llm_router.snapshot()
 
 
 
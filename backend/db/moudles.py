@@ -2,7 +2,7 @@ from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 import uuid
-from sqlalchemy import Column, String, Integer, Date, Boolean, DateTime, func, create_engine, UUID, ForeignKey
+from sqlalchemy import Column, String, Integer, Date, Boolean, DateTime, LargeBinary, func, create_engine, UUID, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -26,19 +26,88 @@ class User(Base):
 class Task(Base):
     __tablename__ = 'tasks'
     id = Column(String, primary_key=True, index=True)
-    schedule_id = Column(String, ForeignKey("schedule.id"))
+    schedule_id = Column(String, ForeignKey("schedule.id"), index=True)
     name = Column(String, index=True)
     start_time = Column(String)
     end_time = Column(String)
     priority = Column(String)
     notes = Column(String, nullable=True)
-    date = Column(Date)
+    date = Column(Date, index=True)
 
 class Schedule(Base):
     __tablename__ = 'schedule'
     id = Column(String, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
 
+# A recurring task is stored once as a template and expanded on read,
+# instead of writing one Task row per occurrence.
+class RecurrenceRule(Base):
+    __tablename__ = 'recurrence_rules'
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    schedule_id = Column(String, ForeignKey("schedule.id"), index=True, nullable=False)
+    name = Column(String)
+    start_time = Column(String)
+    end_time = Column(String)
+    priority = Column(String)
+    notes = Column(String, nullable=True)
+    frequency = Column(String, default="weekly")  # "daily" or "weekly"
+    interval = Column(Integer, default=1)
+    weekdays = Column(String, nullable=True)  # comma separated, e.g. "Monday,Wednesday"
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=True)
+
+# Only occurrences that were edited or cancelled are persisted.
+class RecurrenceException(Base):
+    __tablename__ = 'recurrence_exceptions'
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    rule_id = Column(String, ForeignKey("recurrence_rules.id"), index=True, nullable=False)
+    date = Column(Date, index=True, nullable=False)
+    cancelled = Column(Boolean, default=False)
+    name = Column(String, nullable=True)
+    start_time = Column(String, nullable=True)
+    end_time = Column(String, nullable=True)
+    priority = Column(String, nullable=True)
+    notes = Column(String, nullable=True)
+
+# Secret token that lets calendar apps poll a user's ICS feed without a bearer header
+class CalendarFeed(Base):
+    __tablename__ = 'calendar_feeds'
+    token = Column(String, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey("users.id"), unique=True, index=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Set when a schedule is regenerated; the old one is archived by the retention job
+class ScheduleRevision(Base):
+    __tablename__ = 'schedule_revisions'
+    schedule_id = Column(String, ForeignKey("schedule.id"), primary_key=True, index=True)
+    replaced_by = Column(String, ForeignKey("schedule.id"), nullable=False)
+    replaced_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+# Cold storage: a whole schedule's tasks as one gzip-compressed JSON payload
+class ArchivedSchedule(Base):
+    __tablename__ = 'archived_schedules'
+    schedule_id = Column(String, ForeignKey("schedule.id"), primary_key=True, index=True)
+    user_id = Column(String, ForeignKey("users.id"), index=True, nullable=False)
+    first_date = Column(Date, nullable=True)
+    last_date = Column(Date, nullable=True)
+    task_count = Column(Integer, default=0)
+    payload = Column(LargeBinary, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+# Derived per-user, per-day occupancy index: 1440 bits, one per minute (see services/availability.py).
+# Rows are rebuilt from tasks and recurrences, so deleting one is always safe.
+class AvailabilityDay(Base):
+    __tablename__ = 'availability_days'
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True, index=True)
+    date = Column(Date, primary_key=True)
+    busy = Column(LargeBinary, nullable=False)
+
+# Telegram chat that receives a user's reminders
+class TelegramBinding(Base):
+    __tablename__ = 'telegram_bindings'
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True, index=True)
+    chat_id = Column(String, nullable=False)
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -79,6 +148,49 @@ class OutputSchema(BaseModel):
     schedule: List[ScheduleItem]
     notes: Optional[str] = None
 
+class BatchScheduleRequest(BaseModel):
+    schedules: List[InputSchema]
+
+class BatchScheduleResult(BaseModel):
+    index: int  # position in the request
+    status: str  # "ok" or "error"
+    schedule_id: Optional[str] = None
+    schedule: Optional[List[ScheduleItem]] = None
+    error: Optional[str] = None
+
+class BatchScheduleOut(BaseModel):
+    results: List[BatchScheduleResult]
+
+class RecurrenceRuleSchema(BaseModel):
+    task_name: str
+    start_time: str  # "HH:MM"
+    end_time: str
+    priority: str
+    notes: Optional[str] = None
+    frequency: str = "weekly"  # "daily" or "weekly"
+    interval: int = 1
+    weekdays: Optional[List[str]] = None  # e.g. ["Monday", "Wednesday"], weekly only
+    start_date: str  # "YYYY-MM-DD"
+    end_date: Optional[str] = None
+
+class RecurrenceRuleOut(RecurrenceRuleSchema):
+    rule_id: str
+    schedule_id: str
+
+class CalendarFeedOut(BaseModel):
+    feed_url: str
+
+class TelegramBindingSchema(BaseModel):
+    chat_id: str
+
+class OccurrenceEditSchema(BaseModel):
+    cancelled: bool = False
+    task_name: Optional[str] = None
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    priority: Optional[str] = None
+    notes: Optional[str] = None
+
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 
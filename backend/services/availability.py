@@ -0,0 +1,88 @@
+from typing import Iterable, List, Optional, Tuple
+
+# One bit per minute of the day; bit i set means minute i is busy.
+# Python ints act as the bitset, so AND/OR/shift work a machine word at a time.
+MINUTES_PER_DAY = 1440
+FULL_DAY = (1 << MINUTES_PER_DAY) - 1
+DAY_BYTES = MINUTES_PER_DAY // 8
+
+
+def to_minute(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")[:2]
+    return min(MINUTES_PER_DAY, int(hours) * 60 + int(minutes))
+
+
+def to_hhmm(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def range_mask(start: int, end: int) -> int:
+    """Bits [start, end) set."""
+    start, end = max(0, start), min(MINUTES_PER_DAY, end)
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def busy_mask(intervals: Iterable[Tuple[str, str]]) -> int:
+    """OR together ("HH:MM", "HH:MM") intervals; anything unparsable is skipped."""
+    mask = 0
+    for start_time, end_time in intervals:
+        try:
+            start, end = to_minute(start_time), to_minute(end_time)
+        except (AttributeError, ValueError):
+            continue
+        if end < start:
+            end = MINUTES_PER_DAY  # runs past midnight; clamp to this day
+        mask |= range_mask(start, end)
+    return mask
+
+
+def to_bytes(mask: int) -> bytes:
+    return mask.to_bytes(DAY_BYTES, "little")
+
+
+def from_bytes(data: bytes) -> int:
+    return int.from_bytes(data, "little")
+
+
+def run_starts(free: int, length: int) -> int:
+    """Bits i set where minutes i .. i+length-1 are all free (log2(length) shift-ANDs)."""
+    starts, covered = free, 1
+    while covered < length and starts:
+        step = min(covered, length - covered)
+        starts &= starts >> step
+        covered += step
+    return starts
+
+
+def first_free_slot(busy: int, duration: int, window_start: int, window_end: int) -> Optional[int]:
+    """First minute in [window_start, window_end) that starts `duration` free minutes, or None."""
+    if duration <= 0 or duration > MINUTES_PER_DAY:
+        return None
+    free = ~busy & range_mask(window_start, window_end)
+    starts = run_starts(free, duration)
+    if not starts:
+        return None
+    return (starts & -starts).bit_length() - 1
+
+
+def runs(mask: int) -> List[Tuple[int, int]]:
+    """Split a mask into [start, end) runs of set bits."""
+    result = []
+    while mask:
+        start = (mask & -mask).bit_length() - 1
+        shifted = mask >> start
+        length = (shifted ^ (shifted + 1)).bit_length() - 1  # trailing ones
+        result.append((start, start + length))
+        mask &= ~range_mask(start, start + length)
+    return result
+
+
+def free_busy(busy: int, window_start: int, window_end: int) -> dict:
+    """Busy and free intervals (as "HH:MM" pairs) inside the working-hours window."""
+    window = range_mask(window_start, window_end)
+    return {
+        "busy": [{"start": to_hhmm(start), "end": to_hhmm(end)} for start, end in runs(busy & window)],
+        "free": [{"start": to_hhmm(start), "end": to_hhmm(end)} for start, end in runs(~busy & window)],
+    }
@@ -0,0 +1,115 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Callable, Dict, Optional, Set
+
+CHANNEL_PREFIX = "events:user:"
+
+
+class TooManyConnections(Exception):
+    """Raised when a user or this worker is already at its connection limit."""
+
+
+def publish_event(redis_client, user_id: str, event_type: str, **fields):
+    """Publish a schedule-change event for one user to every API worker (sync Redis client)."""
+    event = {"type": event_type, "at": datetime.utcnow().isoformat(timespec="seconds") + "Z", **fields}
+    redis_client.publish(f"{CHANNEL_PREFIX}{user_id}", json.dumps(event))
+
+
+class Subscription:
+    def __init__(self, user_id: str, max_queue: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+
+
+class EventHub:
+    """Per-worker fan-out of Redis pub/sub events to connected clients.
+
+    A single Redis subscription per worker is started when the first client
+    connects and stopped when the last one leaves, so a worker without open
+    dashboards does no pub/sub work at all.
+    """
+
+    def __init__(self, redis_factory: Optional[Callable] = None, max_per_user: int = 5,
+                 max_connections: int = 1000, max_queue: int = 100):
+        self.redis_factory = redis_factory
+        self.max_per_user = max_per_user
+        self.max_connections = max_connections
+        self.max_queue = max_queue
+        self.subscribers: Dict[str, Set[Subscription]] = {}
+        self.listener: Optional[asyncio.Task] = None
+
+    def connection_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self.subscribers.values())
+
+    def subscribe(self, user_id: str) -> Subscription:
+        if self.connection_count() >= self.max_connections:
+            raise TooManyConnections("Too many open event streams on this server")
+        if len(self.subscribers.get(user_id, ())) >= self.max_per_user:
+            raise TooManyConnections("Too many open event streams for this user")
+        subscription = Subscription(user_id, self.max_queue)
+        self.subscribers.setdefault(user_id, set()).add(subscription)
+        if self.redis_factory is not None and (self.listener is None or self.listener.done()):
+            self.listener = asyncio.create_task(self._listen())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self.subscribers.get(subscription.user_id)
+        if subscriptions:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscribers[subscription.user_id]
+        if not self.subscribers and self.listener is not None:
+            self.listener.cancel()
+            self.listener = None
+
+    def dispatch(self, user_id: str, event: dict):
+        """Hand an event to every local subscriber of `user_id`."""
+        for subscription in list(self.subscribers.get(user_id, ())):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A client that can't keep up is disconnected; it reconnects and refetches
+                subscription.closed = True
+                self.unsubscribe(subscription)
+
+    async def _listen(self):
+        while True:
+            client = self.redis_factory()
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    self.dispatch(channel[len(CHANNEL_PREFIX):], json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Event listener error, reconnecting: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+
+async def event_stream(hub: EventHub, subscription: Subscription, is_disconnected: Callable,
+                       heartbeat: float = 15.0):
+    """Server-Sent Events for one subscription, with comment heartbeats to detect dead clients."""
+    try:
+        yield "retry: 5000\n\n"
+        while not subscription.closed:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,133 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from backend.services.recurrence import occurrence_dates, parse_weekdays
+
+PRODID = "-//MasterMinutes//Schedule Feed//EN"
+ICS_DAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+
+def escape_text(value: Optional[str]) -> str:
+    """Escape a TEXT value as required by RFC 5545."""
+    if not value:
+        return ""
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold(line: str) -> str:
+    """Fold a content line at 75 octets and terminate it with CRLF."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    while len(encoded) > (75 if not parts else 74):
+        cut = 75 if not parts else 74  # continuation lines start with a space
+        # Never split a multi-byte character
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def parse_time(hhmm: Optional[str]) -> Optional[time]:
+    """"HH:MM" (or "HH:MM:SS") as a time, or None if it doesn't parse."""
+    for pattern in ("%H:%M", "%H:%M:%S"):
+        try:
+            return datetime.strptime(hhmm, pattern).time()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def has_valid_times(*values: Optional[str]) -> bool:
+    return all(parse_time(value) is not None for value in values)
+
+
+def format_local(day: date, hhmm: str) -> str:
+    # Floating local time: the calendar app shows it in the user's own timezone
+    return datetime.combine(day, parse_time(hhmm)).strftime("%Y%m%dT%H%M%S")
+
+
+def format_stamp(stamp: datetime) -> str:
+    return stamp.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _event(uid: str, stamp: str, day: date, start_time: str, end_time: str, name: str,
+           priority: Optional[str], notes: Optional[str], extra: Iterable[str] = ()) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{format_local(day, start_time)}",
+        f"DTEND:{format_local(day, end_time)}",
+        f"SUMMARY:{escape_text(name)}",
+    ]
+    if priority:
+        lines.append(f"CATEGORIES:{escape_text(priority)}")
+    if notes:
+        lines.append(f"DESCRIPTION:{escape_text(notes)}")
+    lines.extend(extra)
+    lines.append("END:VEVENT")
+    return "".join(fold(line) for line in lines)
+
+
+def task_event(task, stamp: str) -> str:
+    """The task's VEVENT, or "" when its times don't parse (one bad row must not break the feed)."""
+    if not has_valid_times(task.start_time, task.end_time):
+        return ""
+    return _event(f"{task.id}@masterminutes", stamp, task.date, task.start_time, task.end_time,
+                  task.name, task.priority, task.notes)
+
+
+def recurrence_events(rule, exceptions: List, stamp: str) -> Iterator[str]:
+    """One VEVENT with an RRULE for the template, plus one override VEVENT per edited occurrence."""
+    if not has_valid_times(rule.start_time, rule.end_time):
+        return
+    uid = f"{rule.id}@masterminutes"
+    rrule = f"RRULE:FREQ={'DAILY' if rule.frequency == 'daily' else 'WEEKLY'};INTERVAL={max(rule.interval or 1, 1)}"
+    if rule.frequency != "daily":
+        weekdays = sorted(parse_weekdays(rule.weekdays) or {rule.start_date.weekday()})
+        rrule += ";BYDAY=" + ",".join(ICS_DAYS[day] for day in weekdays)
+    if rule.end_date:
+        rrule += f";UNTIL={format_local(rule.end_date, '23:59')}"
+    # The template's own start date may not match BYDAY; anchor DTSTART on its first real occurrence,
+    # found the way the API expands it so that INTERVAL counts the same weeks
+    interval = max(rule.interval or 1, 1)
+    first = next(occurrence_dates(rule, rule.start_date, rule.start_date + timedelta(days=7 * (interval + 1))), None)
+    if first is None:
+        return  # ends before its first occurrence
+    extra = [rrule]
+    extra.extend(f"EXDATE:{format_local(exception.date, rule.start_time)}"
+                 for exception in exceptions if exception.cancelled)
+    yield _event(uid, stamp, first, rule.start_time, rule.end_time, rule.name, rule.priority, rule.notes, extra)
+
+    for exception in exceptions:
+        if exception.cancelled:
+            continue
+        start_time, end_time = exception.start_time or rule.start_time, exception.end_time or rule.end_time
+        if not has_valid_times(start_time, end_time):
+            continue
+        yield _event(uid, stamp, exception.date, start_time, end_time, exception.name or rule.name,
+                     exception.priority or rule.priority, exception.notes if exception.notes is not None else rule.notes,
+                     [f"RECURRENCE-ID:{format_local(exception.date, rule.start_time)}"])
+
+
+def stream_calendar(tasks: Iterable, rules: Iterable, exceptions: Dict[str, List],
+                    stamp: datetime, name: str = "MasterMinutes") -> Iterator[str]:
+    """Yield an iCalendar document chunk by chunk; `tasks` may be a lazy DB cursor."""
+    stamp_text = format_stamp(stamp)
+    yield "".join(fold(line) for line in [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{escape_text(name)}",
+    ])
+    for task in tasks:
+        yield task_event(task, stamp_text)
+    for rule in rules:
+        yield from recurrence_events(rule, exceptions.get(rule.id, []), stamp_text)
+    yield fold("END:VCALENDAR")
@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from backend.services.llm_router import ProviderError
+
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def normalize_instruction(system_instruction: str) -> str:
+    # The scheduler prompt embeds today's date; without this a recording would only replay on the day it was made
+    return ISO_DATE.sub("<date>", system_instruction)
+
+
+def fingerprint(system_instruction: str, messages: List[str], temperature: float,
+                normalize: Callable[[str], str] = normalize_instruction) -> str:
+    """Stable identity of an LLM request, independent of which provider answered it."""
+    canonical = json.dumps({
+        "system_instruction": normalize(system_instruction),
+        "messages": messages,
+        "temperature": temperature,
+    }, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class RecordingStore:
+    """Append-only JSONL file of LLM responses, indexed by request fingerprint.
+
+    Each line is one call: fingerprint, the user messages and temperature
+    (so benchmarks can re-issue the request), provider, latency,
+    response_text, total_tokens and recorded_at. Lines are only ever
+    appended, so several processes can record into the same file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.records: Dict[str, List[dict]] = {}
+        self.cursors: Dict[str, int] = {}
+        self.load()
+
+    def load(self):
+        self.records = {}
+        self.cursors = {}
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                for line in handle:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a torn last line from a crashed writer
+                    self.records.setdefault(record["fingerprint"], []).append(record)
+        except FileNotFoundError:
+            pass
+
+    def append(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line)
+            self.records.setdefault(record["fingerprint"], []).append(record)
+
+    def next(self, key: str) -> Optional[dict]:
+        """Recordings of one fingerprint are replayed in the order they were made, then wrap around."""
+        with self.lock:
+            records = self.records.get(key)
+            if not records:
+                return None
+            index = self.cursors.get(key, 0)
+            self.cursors[key] = index + 1
+            return records[index % len(records)]
+
+    def __len__(self):
+        return sum(len(records) for records in self.records.values())
+
+
+class RecordingProvider:
+    """Wraps a real provider and appends every successful answer to the store.
+
+    Pass the router's `validate` so answers it would reject are not recorded;
+    replaying them would only trigger the caller's retries.
+    """
+
+    def __init__(self, inner, store: RecordingStore, validate: Optional[Callable[[str], bool]] = None):
+        self.inner = inner
+        self.store = store
+        self.validate = validate
+        self.name = inner.name
+
+    async def generate(self, system_instruction: str, messages: List[str], temperature: float) -> dict:
+        started = time.monotonic()
+        result = await self.inner.generate(system_instruction, messages, temperature)
+        if self.validate is not None and not self.validate(result["response_text"]):
+            return result
+        self.store.append({
+            "fingerprint": fingerprint(system_instruction, messages, temperature),
+            "messages": messages,
+            "temperature": temperature,
+            "provider": self.inner.name,
+            "latency": round(time.monotonic() - started, 4),
+            "response_text": result["response_text"],
+            "total_tokens": result.get("total_tokens", 0),
+            "recorded_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        })
+        return result
+
+
+class ReplayProvider:
+    """Answers from the store instead of the network, with the recorded latency or none at all."""
+
+    def __init__(self, store: RecordingStore, latency: str = "zero", name: str = "replay"):
+        if latency not in ("zero", "original"):
+            raise ValueError("latency must be 'zero' or 'original'")
+        self.store = store
+        self.latency = latency
+        self.name = name
+
+    async def generate(self, system_instruction: str, messages: List[str], temperature: float) -> dict:
+        record = self.store.next(fingerprint(system_instruction, messages, temperature))
+        if record is None:
+            raise ProviderError("no recording for this request")
+        if self.latency == "original":
+            await asyncio.sleep(record.get("latency", 0))
+        return {"response_text": record["response_text"], "total_tokens": record.get("total_tokens", 0)}
@@ -0,0 +1,221 @@
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+
+class ProviderError(Exception):
+    """Raised when a provider call fails or returns an unusable result."""
+
+
+class AllProvidersFailed(Exception):
+    """Raised when every configured provider failed for a request."""
+
+
+# Providers expose `name` and an async `generate` returning {"response_text": str, "total_tokens": int}
+
+class GeminiProvider:
+    def __init__(self, model_name: str, api_key: str):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.genai = genai
+        self.model_name = model_name
+        self.name = f"gemini:{model_name}"
+
+    async def generate(self, system_instruction: str, messages: List[str], temperature: float) -> dict:
+        model = self.genai.GenerativeModel(self.model_name, system_instruction=system_instruction)
+        contents = [{"role": "user", "parts": [{"text": text}]} for text in messages]
+        response = await model.generate_content_async(contents, generation_config={"temperature": temperature})
+        if not response.text:
+            raise ProviderError("empty response")
+        usage = getattr(response, "usage_metadata", None)
+        return {"response_text": response.text, "total_tokens": getattr(usage, "total_token_count", 0) or 0}
+
+
+class OpenAIProvider:
+    def __init__(self, model_name: str, api_key: str, base_url: Optional[str] = None):
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+        self.model_name = model_name
+        self.name = f"openai:{model_name}"
+
+    async def generate(self, system_instruction: str, messages: List[str], temperature: float) -> dict:
+        response = await self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[{"role": "system", "content": system_instruction}]
+            + [{"role": "user", "content": text} for text in messages],
+            temperature=temperature,
+        )
+        text = response.choices[0].message.content if response.choices else None
+        if not text:
+            raise ProviderError("empty response")
+        usage = getattr(response, "usage", None)
+        return {"response_text": text, "total_tokens": getattr(usage, "total_tokens", 0) or 0}
+
+
+class FakeProvider:
+    """Local provider with scripted latency and failures, for tests and offline runs."""
+
+    def __init__(self, name: str, response_text: str = "[]", latency: float = 0.0, fail: bool = False):
+        self.name = name
+        self.response_text = response_text
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self, system_instruction: str, messages: List[str], temperature: float) -> dict:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise ProviderError(f"{self.name} is down")
+        return {"response_text": self.response_text, "total_tokens": len(self.response_text) // 4}
+
+
+# Rolling latency and error rate of one provider
+
+class ProviderStats:
+    def __init__(self, window: int = 100):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True for success
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+
+    def record_lower_bound(self, latency: float):
+        # A cancelled call took at least this long; without it a provider that slowed down
+        # and always loses the hedge would keep its old, fast percentiles
+        self.latencies.append(latency)
+
+    def record_failure(self):
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def snapshot(self, now: float) -> dict:
+        return {
+            "samples": len(self.outcomes),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "error_rate": self.error_rate(),
+            "circuit_open": self.open_until > now,
+        }
+
+
+class LLMRouter:
+    """Routes a request to the fastest healthy provider and hedges slow calls.
+
+    The primary provider gets the request first. If it hasn't answered by its
+    own rolling p95 latency, the same request is sent to the next-best
+    provider and the first valid answer wins; the other call is cancelled.
+    Failed or invalid answers fail over to the remaining providers.
+    """
+
+    def __init__(self, providers: List, hedge_delay: float = 8.0, min_samples: int = 5,
+                 max_error_rate: float = 0.5, failure_threshold: int = 3, cooldown: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = providers
+        self.stats: Dict[str, ProviderStats] = {provider.name: ProviderStats() for provider in providers}
+        self.hedge_delay = hedge_delay  # used until a provider has min_samples latencies
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+
+    def healthy(self, provider) -> bool:
+        stats = self.stats[provider.name]
+        return stats.open_until <= self.clock() and stats.error_rate() <= self.max_error_rate
+
+    def ranked(self) -> List:
+        """Healthy providers first, then by rolling median latency; unknown latency sorts last among equals."""
+        def key(item):
+            index, provider = item
+            p50 = self.stats[provider.name].percentile(0.5)
+            return (not self.healthy(provider), p50 is None, p50 or 0.0, index)
+        return [provider for _, provider in sorted(enumerate(self.providers), key=key)]
+
+    def hedge_after(self, provider) -> float:
+        stats = self.stats[provider.name]
+        if len(stats.latencies) < self.min_samples:
+            return self.hedge_delay
+        return stats.percentile(0.95)
+
+    def snapshot(self) -> Dict[str, dict]:
+        now = self.clock()
+        return {name: stats.snapshot(now) for name, stats in self.stats.items()}
+
+    async def _call(self, provider, validate, system_instruction, messages, temperature) -> dict:
+        started = self.clock()
+        stats = self.stats[provider.name]
+        try:
+            result = await provider.generate(system_instruction, messages, temperature)
+            if validate is not None and not validate(result["response_text"]):
+                raise ProviderError("invalid response")
+        except asyncio.CancelledError:
+            stats.record_lower_bound(self.clock() - started)
+            raise
+        except Exception:
+            stats.record_failure()
+            if stats.consecutive_failures >= self.failure_threshold:
+                stats.open_until = self.clock() + self.cooldown
+            raise
+        stats.record_success(self.clock() - started)
+        return dict(result, provider=provider.name)
+
+    async def generate(self, system_instruction: str, messages: List[str], temperature: float = 1.0,
+                       validate: Optional[Callable[[str], bool]] = None) -> dict:
+        queue = self.ranked()
+        pending = set()
+        errors = []
+
+        def launch():
+            provider = queue.pop(0)
+            task = asyncio.ensure_future(self._call(provider, validate, system_instruction, messages, temperature))
+            task.provider_name = provider.name
+            pending.add(task)
+            return provider
+
+        try:
+            primary = launch()
+            timeout = self.hedge_after(primary)
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Primary is slower than its p95: hedge with the next provider
+                    if queue:
+                        launch()
+                    timeout = None
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(f"{task.provider_name}: {task.exception()}")
+                if not pending and queue:
+                    # Everything in flight failed: fail over to the next provider
+                    timeout = self.hedge_after(launch())
+            raise AllProvidersFailed("; ".join(errors) or "no providers available")
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,128 @@
+import math
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+# Token bucket in one atomic step: refill from elapsed time, then try to take `cost` tokens.
+# Uses the Redis clock so every API worker agrees on "now".
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """Parse "5/60" (5 requests per 60 seconds) into (capacity, refill tokens per second)."""
+    requests, seconds = rate.split("/")
+    capacity = int(requests)
+    return capacity, capacity / float(seconds)
+
+
+class RedisRateLimiter:
+    """Shared limiter state in Redis, so limits hold across API workers."""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self.token_bucket = redis_client.register_script(TOKEN_BUCKET_LUA)
+
+    def take(self, key: str, capacity: int, rate: float, cost: int = 1) -> float:
+        """Take `cost` tokens from the bucket; returns 0 if allowed, else seconds until it would be."""
+        return float(self.token_bucket(keys=[f"ratelimit:{key}"], args=[capacity, rate, cost]))
+
+    def add_usage(self, key: str, amount: int, ttl: int) -> int:
+        pipe = self.redis.pipeline()
+        pipe.incrby(f"usage:{key}", amount)
+        pipe.expire(f"usage:{key}", ttl)
+        return int(pipe.execute()[0])
+
+    def get_usage(self, key: str) -> int:
+        return int(self.redis.get(f"usage:{key}") or 0)
+
+
+class InMemoryRateLimiter:
+    """Single-process stand-in for RedisRateLimiter, used by tests and local runs."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+        self.usage: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float, cost: int = 1) -> float:
+        with self.lock:
+            now = self.clock()
+            tokens, last = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - last) * rate)
+            retry_after = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / rate
+            self.buckets[key] = (tokens, now)
+            return retry_after
+
+    def add_usage(self, key: str, amount: int, ttl: int) -> int:
+        # Keys are per day, so entries never need expiring within a test run
+        with self.lock:
+            self.usage[key] = self.usage.get(key, 0) + amount
+            return self.usage[key]
+
+    def get_usage(self, key: str) -> int:
+        return self.usage.get(key, 0)
+
+
+def seconds_until_tomorrow(now: Optional[datetime] = None) -> int:
+    now = now or datetime.utcnow()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return max(1, math.ceil((tomorrow - now).total_seconds()))
+
+
+class LLMBudget:
+    """Daily per-user LLM token and cost budget (UTC days).
+
+    Cost is tracked in integer micro-dollars so it can live in a Redis counter.
+    A limit of 0 disables that budget.
+    """
+
+    def __init__(self, limiter, daily_tokens: int, daily_cost_usd: float, cost_per_1k_tokens_usd: float):
+        self.limiter = limiter
+        self.daily_tokens = daily_tokens
+        self.daily_cost_micros = int(daily_cost_usd * 1_000_000)
+        self.cost_per_1k_micros = int(cost_per_1k_tokens_usd * 1_000_000)
+
+    def _keys(self, user_id: str, day: date) -> Tuple[str, str]:
+        return f"llm_tokens:{user_id}:{day.isoformat()}", f"llm_cost:{user_id}:{day.isoformat()}"
+
+    def check(self, user_id: str, now: Optional[datetime] = None) -> float:
+        """Return 0 if the user may call the LLM today, else seconds until the budget resets."""
+        now = now or datetime.utcnow()
+        tokens_key, cost_key = self._keys(user_id, now.date())
+        if self.daily_tokens and self.limiter.get_usage(tokens_key) >= self.daily_tokens:
+            return seconds_until_tomorrow(now)
+        if self.daily_cost_micros and self.limiter.get_usage(cost_key) >= self.daily_cost_micros:
+            return seconds_until_tomorrow(now)
+        return 0
+
+    def record(self, user_id: str, tokens: int, now: Optional[datetime] = None):
+        now = now or datetime.utcnow()
+        tokens_key, cost_key = self._keys(user_id, now.date())
+        ttl = 2 * 24 * 3600
+        self.limiter.add_usage(tokens_key, tokens, ttl)
+        self.limiter.add_usage(cost_key, tokens * self.cost_per_1k_micros // 1000, ttl)
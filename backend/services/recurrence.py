@@ -0,0 +1,104 @@
+import re
+from datetime import date, datetime, timedelta
+from heapq import merge
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Longest window a single read may expand, so one request can't walk years of occurrences
+MAX_WINDOW_DAYS = 366
+
+# Zero-padded 24-hour "HH:MM"; occurrences are sorted by these strings
+HHMM = re.compile(r"([01]\d|2[0-3]):[0-5]\d")
+
+
+def is_hhmm(value: Optional[str]) -> bool:
+    return bool(value) and HHMM.fullmatch(value) is not None
+
+
+def parse_weekdays(weekdays: Optional[str]) -> set:
+    """Turn the stored "Monday,Wednesday" string into a set of weekday numbers."""
+    if not weekdays:
+        return set()
+    return {WEEKDAYS.index(day.strip().capitalize()) for day in weekdays.split(",") if day.strip()}
+
+
+def occurrence_id(rule_id: str, day: date) -> str:
+    # Stable id so an occurrence can be addressed (and edited) without ever being stored
+    return f"{rule_id}_{day.isoformat()}"
+
+
+def occurrence_dates(rule, window_start: date, window_end: date) -> Iterator[date]:
+    """Yield the dates on which `rule` fires inside [window_start, window_end]."""
+    first = max(rule.start_date, window_start)
+    last = min(rule.end_date, window_end) if rule.end_date else window_end
+    if first > last:
+        return
+    interval = max(rule.interval or 1, 1)
+
+    if rule.frequency == "daily":
+        # Jump straight to the first matching day instead of scanning from start_date
+        offset = (first - rule.start_date).days % interval
+        day = first if offset == 0 else first + timedelta(days=interval - offset)
+        while day <= last:
+            yield day
+            day += timedelta(days=interval)
+        return
+
+    weekdays = parse_weekdays(rule.weekdays) or {rule.start_date.weekday()}
+    anchor = rule.start_date - timedelta(days=rule.start_date.weekday())  # Monday of the first week
+    day = first
+    while day <= last:
+        week = (day - anchor).days // 7
+        if week % interval == 0:
+            if day.weekday() in weekdays:
+                yield day
+            day += timedelta(days=1)
+        else:
+            # Skip the rest of an inactive week in one step
+            day += timedelta(days=7 - day.weekday())
+
+
+def expand_rule(rule, window_start: date, window_end: date,
+                exceptions: Optional[Dict[Tuple[str, date], object]] = None) -> Iterator[dict]:
+    """Yield ScheduleItem-shaped dicts for one rule, applying persisted exceptions."""
+    exceptions = exceptions or {}
+    for day in occurrence_dates(rule, window_start, window_end):
+        override = exceptions.get((rule.id, day))
+        if override is not None and override.cancelled:
+            continue
+        item = {
+            "task_id": occurrence_id(rule.id, day),
+            "task_name": rule.name,
+            "start_time": rule.start_time,
+            "end_time": rule.end_time,
+            "priority": rule.priority,
+            "day": WEEKDAYS[day.weekday()],
+            "date": day.strftime("%Y-%m-%d"),
+            "notes": rule.notes,
+        }
+        if override is not None:
+            for field, column in (("task_name", "name"), ("start_time", "start_time"),
+                                  ("end_time", "end_time"), ("priority", "priority"), ("notes", "notes")):
+                value = getattr(override, column)
+                if value is not None:
+                    item[field] = value
+        yield item
+
+
+def expand_rules(rules: Iterable, window_start: date, window_end: date,
+                 exceptions: Optional[Dict[Tuple[str, date], object]] = None) -> Iterator[dict]:
+    """Lazily merge the occurrences of several rules in (date, start_time) order."""
+    streams = [expand_rule(rule, window_start, window_end, exceptions) for rule in rules]
+    return merge(*streams, key=lambda item: (item["date"], item["start_time"]))
+
+
+def parse_window(start: Optional[str], end: Optional[str]) -> Tuple[date, date]:
+    """Parse and validate a requested "YYYY-MM-DD" window, defaulting to the next 7 days."""
+    window_start = datetime.strptime(start, "%Y-%m-%d").date() if start else date.today()
+    window_end = datetime.strptime(end, "%Y-%m-%d").date() if end else window_start + timedelta(days=6)
+    if window_end < window_start:
+        raise ValueError("end must not be before start")
+    if (window_end - window_start).days >= MAX_WINDOW_DAYS:
+        raise ValueError(f"window may span at most {MAX_WINDOW_DAYS} days")
+    return window_start, window_end
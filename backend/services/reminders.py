@@ -0,0 +1,116 @@
+import time
+import zlib
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Set
+
+from backend.services.recurrence import expand_rule
+
+# Users are hashed into a fixed number of partitions; workers lease contiguous
+# ranges of partitions, so adding a worker only moves a slice of users.
+PARTITIONS = 64
+
+RENEW_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def partition_for(user_id: str, partitions: int = PARTITIONS) -> int:
+    # crc32 rather than hash(): it must agree across processes
+    return zlib.crc32(user_id.encode()) % partitions
+
+
+def desired_partitions(worker_id: str, live_workers: List[str], partitions: int = PARTITIONS) -> Set[int]:
+    """The contiguous partition range `worker_id` should own among the live workers."""
+    workers = sorted(set(live_workers) | {worker_id})
+    index = workers.index(worker_id)
+    start = index * partitions // len(workers)
+    end = (index + 1) * partitions // len(workers)
+    return set(range(start, end))
+
+
+def due_occurrences(rules: Iterable, exceptions: Dict, now: datetime, upper_bound: datetime) -> List[SimpleNamespace]:
+    """Occurrences of recurring rules starting in [now, upper_bound], shaped like Task rows for the sender.
+
+    Their id is the occurrence id, so reminder_key tells occurrences of the same rule apart.
+    """
+    due = []
+    for rule in rules:
+        for item in expand_rule(rule, now.date(), upper_bound.date(), exceptions):
+            try:
+                starts = datetime.strptime(f"{item['date']} {item['start_time']}", "%Y-%m-%d %H:%M")
+            except (TypeError, ValueError):
+                continue
+            if now <= starts <= upper_bound:
+                due.append(SimpleNamespace(id=item["task_id"], schedule_id=rule.schedule_id, name=item["task_name"],
+                                           start_time=item["start_time"], date=starts.date()))
+    return due
+
+
+def reminder_key(task) -> str:
+    # start_time is part of the key so moving a task re-arms its reminder
+    return f"reminder:sent:{task.id}:{task.date.isoformat()}:{task.start_time}"
+
+
+class PartitionLeaseManager:
+    """Keeps this worker's share of reminder partitions leased in Redis.
+
+    Workers heartbeat into a sorted set; every `rebalance` recomputes the
+    fair share from the live members, releases partitions that now belong to
+    someone else and leases (or renews) its own. A crashed worker's leases
+    simply expire and are picked up by the others.
+    """
+
+    def __init__(self, redis_client, worker_id: str, partitions: int = PARTITIONS, lease_ttl: float = 90.0):
+        self.redis = redis_client
+        self.worker_id = worker_id
+        self.partitions = partitions
+        self.lease_ttl = lease_ttl
+        self.owned: Set[int] = set()
+        self.renew_script = redis_client.register_script(RENEW_LUA)
+        self.release_script = redis_client.register_script(RELEASE_LUA)
+
+    def lease_key(self, partition: int) -> str:
+        return f"reminder:lease:{partition}"
+
+    def live_workers(self) -> List[str]:
+        now = time.time()
+        pipe = self.redis.pipeline()
+        pipe.zadd("reminder:workers", {self.worker_id: now})
+        pipe.zremrangebyscore("reminder:workers", 0, now - self.lease_ttl)
+        pipe.zrange("reminder:workers", 0, -1)
+        members = pipe.execute()[-1]
+        return [member.decode() if isinstance(member, bytes) else member for member in members]
+
+    def rebalance(self) -> Set[int]:
+        desired = desired_partitions(self.worker_id, self.live_workers(), self.partitions)
+        ttl_ms = int(self.lease_ttl * 1000)
+
+        for partition in self.owned - desired:
+            self.release_script(keys=[self.lease_key(partition)], args=[self.worker_id])
+        owned = set()
+        for partition in desired:
+            key = self.lease_key(partition)
+            if partition in self.owned and self.renew_script(keys=[key], args=[self.worker_id, ttl_ms]):
+                owned.add(partition)
+            elif self.redis.set(key, self.worker_id, nx=True, px=ttl_ms):
+                owned.add(partition)
+            # Otherwise the previous owner still holds it; it is released on their next rebalance
+        self.owned = owned
+        return owned
+
+    def shutdown(self):
+        for partition in self.owned:
+            self.release_script(keys=[self.lease_key(partition)], args=[self.worker_id])
+        self.redis.zrem("reminder:workers", self.worker_id)
+        self.owned = set()
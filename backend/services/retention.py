@@ -0,0 +1,119 @@
+import gzip
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.db.moudles import ArchivedSchedule, Schedule, ScheduleRevision, Task
+from backend.services.serialization import dumps, loads
+
+
+def pack_payload(payload: dict) -> bytes:
+    return gzip.compress(dumps(payload), compresslevel=9)
+
+
+def unpack_payload(data: bytes) -> dict:
+    return loads(gzip.decompress(data))
+
+
+def task_to_item(task: Task) -> dict:
+    return {
+        "task_id": task.id,
+        "task_name": task.name,
+        "start_time": task.start_time,
+        "end_time": task.end_time,
+        "priority": task.priority,
+        "day": task.date.strftime("%A"),
+        "date": task.date.strftime("%Y-%m-%d"),
+        "notes": task.notes,
+    }
+
+
+def item_to_task(schedule_id: str, item: dict) -> Task:
+    """A transient (never added to a session) Task for an archived item, so readers can treat both alike."""
+    return Task(
+        id=item["task_id"],
+        schedule_id=schedule_id,
+        name=item["task_name"],
+        start_time=item["start_time"],
+        end_time=item["end_time"],
+        priority=item["priority"],
+        notes=item.get("notes"),
+        date=datetime.strptime(item["date"], "%Y-%m-%d").date(),
+    )
+
+
+def find_candidates(db: Session, retention_days: int, superseded_grace: timedelta, limit: int,
+                    today: Optional[date] = None) -> List[str]:
+    """Schedules whose tasks can leave the hot table: superseded ones first, then fully past ones."""
+    today = today or date.today()
+    superseded = db.query(ScheduleRevision.schedule_id).filter(
+        ScheduleRevision.replaced_at <= datetime.utcnow() - superseded_grace,
+        ScheduleRevision.schedule_id.in_(db.query(Task.schedule_id)),
+    ).limit(limit).all()
+    candidates = [row[0] for row in superseded]
+    if len(candidates) < limit:
+        past = db.query(Task.schedule_id).group_by(Task.schedule_id).having(
+            func.max(Task.date) < today - timedelta(days=retention_days),
+        ).limit(limit - len(candidates)).all()
+        candidates.extend(row[0] for row in past if row[0] not in candidates)
+    return candidates
+
+
+def archive_schedule(db: Session, schedule_id: str) -> Optional[ArchivedSchedule]:
+    """Move all hot tasks of a schedule into one compressed archive row, in a single transaction.
+
+    If the schedule was partly archived before, the new tasks are merged into the existing blob.
+    """
+    schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
+    tasks = db.query(Task).filter(Task.schedule_id == schedule_id).order_by(Task.date, Task.start_time).all()
+    if not schedule or not tasks:
+        return None
+
+    archive = db.query(ArchivedSchedule).filter(ArchivedSchedule.schedule_id == schedule_id).first()
+    items = unpack_payload(archive.payload)["schedule"] if archive else []
+    items.extend(task_to_item(task) for task in tasks)
+    items.sort(key=lambda item: (item["date"], item["start_time"]))
+    payload = {"schedule_id": schedule_id, "schedule": items, "notes": None}
+
+    if not archive:
+        archive = ArchivedSchedule(schedule_id=schedule_id, user_id=schedule.user_id)
+        db.add(archive)
+    archive.payload = pack_payload(payload)
+    archive.task_count = len(items)
+    archive.first_date = datetime.strptime(items[0]["date"], "%Y-%m-%d").date()
+    archive.last_date = datetime.strptime(items[-1]["date"], "%Y-%m-%d").date()
+    archive.archived_at = datetime.utcnow()
+
+    db.query(Task).filter(Task.schedule_id == schedule_id).delete(synchronize_session=False)
+    db.commit()
+    return archive
+
+
+def load_archived_payload(db: Session, schedule_id: str) -> Optional[dict]:
+    archive = db.query(ArchivedSchedule).filter(ArchivedSchedule.schedule_id == schedule_id).first()
+    if not archive:
+        return None
+    return unpack_payload(archive.payload)
+
+
+def archived_items(db: Session, schedule_id: str, start: date, end: date) -> List[dict]:
+    """Archived items of one schedule inside [start, end], in (date, start_time) order."""
+    payload = load_archived_payload(db, schedule_id)
+    if not payload:
+        return []
+    start_text, end_text = start.isoformat(), end.isoformat()
+    return [item for item in payload["schedule"] if start_text <= item["date"] <= end_text]
+
+
+def archived_tasks(db: Session, user_id: str) -> Iterator[Task]:
+    """All archived tasks of a user; a superseded schedule only contributes the days before it was replaced."""
+    rows = db.query(ArchivedSchedule, ScheduleRevision.replaced_at).outerjoin(
+        ScheduleRevision, ScheduleRevision.schedule_id == ArchivedSchedule.schedule_id,
+    ).filter(ArchivedSchedule.user_id == user_id).yield_per(50)
+    for archive, replaced_at in rows:
+        cutoff = replaced_at.date().isoformat() if replaced_at else None
+        for item in unpack_payload(archive.payload)["schedule"]:
+            if cutoff is None or item["date"] < cutoff:
+                yield item_to_task(archive.schedule_id, item)
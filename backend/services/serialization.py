@@ -0,0 +1,172 @@
+import gzip
+import json
+from typing import Dict, Optional, Tuple
+
+# orjson is several times faster than the stdlib encoder and returns bytes directly
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+# Optional extras: brotli for Content-Encoding: br, msgpack for binary payloads
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+COLUMNAR = "application/vnd.masterminutes.columnar+json"
+MSGPACK = "application/msgpack"
+
+# Small bodies aren't worth the CPU (and often grow once compressed)
+MIN_COMPRESS_SIZE = 1024
+
+# Columns whose values repeat across Pomodoro sessions; sent once in a lookup table
+DICTIONARY_COLUMNS = ("priority", "day", "date", "task_name")
+COLUMNS = ("task_id", "task_name", "start_time", "end_time", "priority", "day", "date", "notes")
+
+
+def available_formats() -> Tuple[str, ...]:
+    if msgpack is not None:
+        return (JSON, COLUMNAR, MSGPACK)
+    return (JSON, COLUMNAR)
+
+
+def available_encodings() -> Tuple[str, ...]:
+    if brotli is not None:
+        return ("br", "gzip")
+    return ("gzip",)
+
+
+def _parse_header(header: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept / Accept-Encoding header into {value: q}."""
+    values = {}
+    for part in (header or "").split(","):
+        pieces = [piece.strip() for piece in part.split(";")]
+        if not pieces[0]:
+            continue
+        q = 1.0
+        for param in pieces[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        values[pieces[0].lower()] = q
+    return values
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Pick the response media type from the Accept header, defaulting to plain JSON."""
+    accepted = _parse_header(accept)
+    best, best_q = JSON, 0.0
+    for media_type in available_formats():
+        q = accepted.get(media_type, 0.0)
+        if q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick br or gzip from Accept-Encoding by highest q (server order breaks ties), or None for identity."""
+    accepted = _parse_header(accept_encoding)
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def loads(body):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def to_columnar(payload: dict) -> dict:
+    """Turn {"schedule": [item, ...]} into one list per column.
+
+    Repetitive columns are dictionary encoded: the column holds indexes into
+    `dictionaries[column]`, so "High" or "2025-03-03" is sent once per payload
+    instead of once per session.
+    """
+    items = payload.get("schedule") or []
+    columns = {}
+    dictionaries = {}
+    for column in COLUMNS:
+        values = [item.get(column) for item in items]
+        if column in DICTIONARY_COLUMNS:
+            lookup = {}
+            columns[column] = [lookup.setdefault(value, len(lookup)) for value in values]
+            dictionaries[column] = list(lookup)
+        else:
+            columns[column] = values
+    return {
+        "schedule_id": payload.get("schedule_id"),
+        "notes": payload.get("notes"),
+        "length": len(items),
+        "columns": columns,
+        "dictionaries": dictionaries,
+    }
+
+
+def from_columnar(columnar: dict) -> dict:
+    """Inverse of `to_columnar`, mostly useful for clients and tests."""
+    columns = columnar["columns"]
+    dictionaries = columnar.get("dictionaries", {})
+    items = []
+    for row in range(columnar["length"]):
+        item = {}
+        for column in COLUMNS:
+            value = columns[column][row]
+            if column in dictionaries:
+                value = dictionaries[column][value]
+            item[column] = value
+        items.append(item)
+    return {"schedule_id": columnar.get("schedule_id"), "schedule": items, "notes": columnar.get("notes")}
+
+
+def encode_payload(payload: dict, media_type: str = JSON) -> bytes:
+    if media_type == COLUMNAR:
+        return dumps(to_columnar(payload))
+    if media_type == MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+        return msgpack.packb(to_columnar(payload), use_bin_type=True)
+    return dumps(payload)
+
+
+def compress(body: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Compress `body` with the negotiated encoding; returns the body and the encoding actually used."""
+    if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=5), "br"
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6), "gzip"
+    return body, None
+
+
+def variant_key(key: str, media_type: str, encoding: Optional[str]) -> str:
+    """Cache key for one pre-encoded representation of a schedule."""
+    if media_type == JSON and encoding is None:
+        return key
+    return f"{key}:{media_type}:{encoding or 'identity'}"
+
+
+def all_variant_keys(key: str):
+    for media_type in (JSON, COLUMNAR, MSGPACK):
+        for encoding in (None, "gzip", "br"):
+            yield variant_key(key, media_type, encoding)
@@ -4,11 +4,16 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import os
 import json
+import uuid
+import socket
 import asyncio
 from dotenv import load_dotenv
 import uvicorn
+import redis
 from telegram import Bot
-from backend.db.moudles import Task, SessionLocal  # Make sure your moudles module exposes these
+from backend.db.moudles import Task, Schedule, ScheduleRevision, RecurrenceRule, RecurrenceException, TelegramBinding, TelegramBindingSchema, SessionLocal  # Make sure your moudles module exposes these
+from backend.services.reminders import PartitionLeaseManager, due_occurrences, partition_for, reminder_key
+from backend.services.events import publish_event
 from backend.auth.auth import get_current_active_user  # Import your current active user dependency
 import backend.db.moudles as models
 
@@ -17,8 +22,23 @@ load_dotenv()
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+# Users without a binding get no Telegram messages; a single-tenant deployment can opt in
+# to sending them to the shared TELEGRAM_CHAT_ID instead
+TELEGRAM_SHARED_CHAT_FALLBACK = os.getenv("TELEGRAM_SHARED_CHAT_FALLBACK", "false").lower() == "true"
+FALLBACK_CHAT_ID = TELEGRAM_CHAT_ID if TELEGRAM_SHARED_CHAT_FALLBACK else None
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://postgres:password@db:5432/tasks_db")
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+REMINDER_LEAD_MINUTES = 10
+REMINDER_INTERVAL = 30  # seconds between scans; must stay well below the lease TTL
+LEASE_TTL = 90
+
 app = FastAPI()
+redis_client = redis.Redis.from_url(REDIS_URL)
+
+# Each replica is one worker that leases a share of the user partitions
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+lease_manager = PartitionLeaseManager(redis_client, WORKER_ID, lease_ttl=LEASE_TTL)
 
 # Allow all origins for testing (adjust as needed)
 origins = ["*"]
@@ -45,6 +65,29 @@ async def send_long_message(bot: Bot, chat_id: str, message: str):
     for part in parts:
         await bot.send_message(chat_id=chat_id, text=part, parse_mode="Markdown")
 
+# Helper function to find where a user's messages go; None if they haven't bound a chat
+# (and the shared-chat fallback isn't enabled)
+def get_chat_id(db: Session, user_id: str):
+    binding = db.query(TelegramBinding).filter(TelegramBinding.user_id == user_id).first()
+    if binding:
+        return binding.chat_id
+    return FALLBACK_CHAT_ID
+
+# POST endpoint to bind the current user's reminders to a Telegram chat
+@app.post("/telegram/bind")
+async def bind_telegram_chat(
+    binding_data: TelegramBindingSchema,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    binding = db.query(TelegramBinding).filter(TelegramBinding.user_id == current_user.id).first()
+    if binding:
+        binding.chat_id = binding_data.chat_id
+    else:
+        db.add(TelegramBinding(user_id=current_user.id, chat_id=binding_data.chat_id))
+    db.commit()
+    return {"message": "Telegram chat bound", "chat_id": binding_data.chat_id}
+
 @app.get("/get_schedule/{schedule_id}")
 async def get_schedule_telegram(
     schedule_id: str,
@@ -52,10 +95,17 @@ async def get_schedule_telegram(
     current_user: models.User = Depends(get_current_active_user)  # Ensure we get the authenticated user
 ):
     # Fetch tasks for the current user
-    tasks = db.query(Task).filter(Task.schedule_id == schedule_id).all()
+    tasks = db.query(Task).join(Schedule, Task.schedule_id == Schedule.id).filter(
+        Task.schedule_id == schedule_id,
+        Schedule.user_id == current_user.id,
+    ).all()
     if not tasks:
         return {"message": "No tasks found in the schedule for this user"}
 
+    chat_id = get_chat_id(db, current_user.id)
+    if not chat_id:
+        raise HTTPException(status_code=400, detail="No Telegram chat bound for this user")
+
     # Build the message to be sent to Telegram
     message = "📅 **Your Current Schedule:**\n\n"
     for task in tasks:
@@ -70,13 +120,13 @@ async def get_schedule_telegram(
         # If adding this task exceeds our message length limit, send current message and reset.
         if len(message) + len(task_info) > 4000:
             bot = Bot(token=TELEGRAM_TOKEN)
-            await send_long_message(bot, TELEGRAM_CHAT_ID, message)
+            await send_long_message(bot, chat_id, message)
             message = "📅 **Continued Schedule:**\n\n"
         message += task_info
 
     # Send any remaining message content
     bot = Bot(token=TELEGRAM_TOKEN)
-    await send_long_message(bot, TELEGRAM_CHAT_ID, message)
+    await send_long_message(bot, chat_id, message)
 
     return {"message": "Schedule sent to Telegram"}
 
@@ -85,48 +135,99 @@ async def start_notification_service():
     # This creates a background asyncio task that will run alongside your FastAPI endpoints.
     asyncio.create_task(notification_loop())
 
+@app.on_event("shutdown")
+async def stop_notification_service():
+    # Hand our partitions back right away instead of waiting for the leases to expire
+    lease_manager.shutdown()
+
 async def notification_loop():
-    """Periodically check for tasks starting in 10 minutes and send notifications."""
+    """Periodically rebalance partition leases and send reminders for the partitions we own."""
     while True:
-        await check_and_send_notifications()
-        await asyncio.sleep(60)  # Wait 60 seconds before checking again
-
-async def check_and_send_notifications():
-    """Check the database for tasks that are scheduled to start in 10 minutes and send a Telegram reminder."""
+        try:
+            partitions = lease_manager.rebalance()
+            await check_and_send_notifications(partitions)
+        except Exception as e:
+            print(f"Error in notification loop: {e}")
+        await asyncio.sleep(REMINDER_INTERVAL)
+
+# Helper function to make each reminder go out once, across all workers and restarts
+def claim_reminder(task) -> bool:
+    return bool(redis_client.set(reminder_key(task), WORKER_ID, nx=True, ex=2 * 24 * 3600))
+
+async def check_and_send_notifications(partitions):
+    """Send a Telegram reminder for tasks and recurring occurrences of users in `partitions`
+    that start within the next 10 minutes."""
+    if not partitions:
+        return
     session = SessionLocal()
     try:
         now = datetime.now()
-        # Calculate the target time (10 minutes from now)
-        lower_bound = now + timedelta(minutes=10)
-        upper_bound = lower_bound + timedelta(minutes=1)
+        upper_bound = now + timedelta(minutes=REMINDER_LEAD_MINUTES)
 
-        # Query all tasks (in a more advanced version, filter by date and notified status)
-        tasks = session.query(Task).all()
-        if not tasks:
-            print("no tasks found")
-            return  # No tasks found
+        # Only read the tasks that can fall inside the window; "HH:MM" strings sort chronologically
+        query = session.query(Task, Schedule.user_id).join(Schedule, Task.schedule_id == Schedule.id).filter(
+            ~Task.schedule_id.in_(session.query(ScheduleRevision.schedule_id)),  # replaced by a newer schedule
+        )
+        if now.date() == upper_bound.date():
+            query = query.filter(
+                Task.date == now.date(),
+                Task.start_time >= now.strftime("%H:%M"),
+                Task.start_time <= upper_bound.strftime("%H:%M"),
+            )
+        else:
+            query = query.filter(Task.date.in_([now.date(), upper_bound.date()]))
+        rows = [(task, user_id) for task, user_id in query.all() if partition_for(user_id) in partitions]
+
+        # Recurring templates are expanded for the same window instead of being stored as tasks
+        rules = [(rule, user_id) for rule, user_id in session.query(RecurrenceRule, Schedule.user_id).join(
+            Schedule, RecurrenceRule.schedule_id == Schedule.id,
+        ).filter(
+            RecurrenceRule.start_date <= upper_bound.date(),
+            (RecurrenceRule.end_date.is_(None)) | (RecurrenceRule.end_date >= now.date()),
+        ).all() if partition_for(user_id) in partitions]
+        if rules:
+            exceptions = {(row.rule_id, row.date): row for row in session.query(RecurrenceException).filter(
+                RecurrenceException.rule_id.in_([rule.id for rule, _ in rules]),
+                RecurrenceException.date.in_({now.date(), upper_bound.date()}),
+            ).all()}
+            for rule, user_id in rules:
+                rows.extend((occurrence, user_id) for occurrence in due_occurrences([rule], exceptions, now, upper_bound))
+        if not rows:
+            return
+
+        user_ids = {user_id for _, user_id in rows}
+        chat_ids = {
+            binding.user_id: binding.chat_id
+            for binding in session.query(TelegramBinding).filter(TelegramBinding.user_id.in_(user_ids)).all()
+        }
 
         # Initialize the Telegram Bot
         bot = Bot(token=TELEGRAM_TOKEN)
 
-        for task in tasks:
+        for task, user_id in rows:
             try:
                 # Combine the task's date and start_time string (assumed to be in "HH:MM" format)
                 task_time = datetime.combine(task.date, datetime.strptime(task.start_time, "%H:%M").time())
-                # Check if the task's scheduled datetime falls within our target window.
-                if lower_bound <= task_time < upper_bound:
-                    message = (
-                        f"Reminder: Your task '{task.name}' is scheduled to start at "
-                        f"{task.start_time} on {task.date.strftime('%Y-%m-%d')}."
-                    )
-                    await bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
-                    print(f"Sent notification for task {task.id}")
-                    # Optionally update the task (e.g., task.notified = True) to avoid sending duplicate notifications.
+                chat_id = chat_ids.get(user_id, FALLBACK_CHAT_ID)
+                if not (now <= task_time <= upper_bound) or not chat_id:
+                    continue
+                if not claim_reminder(task):
+                    continue  # Already sent by us or another worker
+                message = (
+                    f"Reminder: Your task '{task.name}' is scheduled to start at "
+                    f"{task.start_time} on {task.date.strftime('%Y-%m-%d')}."
+                )
+                try:
+                    await bot.send_message(chat_id=chat_id, text=message)
+                except Exception:
+                    # Let the next scan retry this reminder
+                    redis_client.delete(reminder_key(task))
+                    raise
+                print(f"Sent notification for task {task.id}")
+                publish_event(redis_client, user_id, "reminder.fired", schedule_id=task.schedule_id, task_id=task.id,
+                              task_name=task.name, start_time=task.start_time, date=task.date.strftime("%Y-%m-%d"))
             except Exception as e:
                 print(f"Error processing task {task.id}: {e}")
-        session.commit()
-    except Exception as e:
-        print(f"Error in notification service: {e}")
     finally:
         session.close()
 
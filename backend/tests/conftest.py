@@ -0,0 +1,33 @@
+import os
+import tempfile
+import uuid
+
+import fakeredis
+import pytest
+
+# backend.core.main reads its configuration at import time, so tests that use the app
+# get a throwaway SQLite database, in-memory rate limits and no retention job
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ["RATE_LIMIT_BACKEND"] = "memory"
+os.environ["RETENTION_INTERVAL_SECONDS"] = "0"
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from backend.core import main
+
+    monkeypatch.setattr(main, "redis_client", fakeredis.FakeRedis())
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def headers(client):
+    """Bearer header of a freshly registered user."""
+    username = f"user-{uuid.uuid4().hex[:8]}"
+    client.post("/register", json={"username": username, "email": f"{username}@example.com", "password": "secret"})
+    token = client.post("/token", data={"username": username, "password": "secret"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
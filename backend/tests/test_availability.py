@@ -0,0 +1,48 @@
+from backend.services.availability import (
+    MINUTES_PER_DAY,
+    busy_mask,
+    first_free_slot,
+    free_busy,
+    from_bytes,
+    run_starts,
+    runs,
+    to_bytes,
+    to_minute,
+)
+
+NINE, FIVE = to_minute("09:00"), to_minute("17:00")
+
+
+def test_busy_mask_and_round_trip():
+    mask = busy_mask([("09:00", "09:25"), ("09:30", "09:55"), ("not a time", "10:00")])
+    assert runs(mask) == [(540, 565), (570, 595)]
+    assert len(to_bytes(mask)) == MINUTES_PER_DAY // 8
+    assert from_bytes(to_bytes(mask)) == mask
+
+
+def test_interval_past_midnight_is_clamped():
+    assert runs(busy_mask([("23:30", "00:15")])) == [(1410, 1440)]
+
+
+def test_run_starts_matches_brute_force():
+    free = 0b1110111110011111
+    for length in range(1, 8):
+        expected = 0
+        for i in range(16):
+            if all(free >> (i + k) & 1 for k in range(length)):
+                expected |= 1 << i
+        assert run_starts(free, length) == expected
+
+
+def test_first_free_slot_skips_short_gaps():
+    busy = busy_mask([("09:00", "09:25"), ("09:30", "10:00")])
+    assert first_free_slot(busy, 5, NINE, FIVE) == to_minute("09:25")
+    assert first_free_slot(busy, 25, NINE, FIVE) == to_minute("10:00")
+    assert first_free_slot(busy, 25, to_minute("16:40"), FIVE) is None
+
+
+def test_free_busy_within_working_hours():
+    busy = busy_mask([("08:00", "09:30"), ("12:00", "13:00")])
+    result = free_busy(busy, NINE, FIVE)
+    assert result["busy"] == [{"start": "09:00", "end": "09:30"}, {"start": "12:00", "end": "13:00"}]
+    assert result["free"] == [{"start": "09:30", "end": "12:00"}, {"start": "13:00", "end": "17:00"}]
@@ -0,0 +1,35 @@
+from datetime import date
+
+from sqlalchemy import event
+
+from backend.core import main
+from backend.db.moudles import AvailabilityDay
+from backend.services.availability import from_bytes
+
+
+def test_concurrent_rebuild_of_the_same_day_does_not_fail():
+    user_id, day = "race-user", date(2030, 1, 7)
+    db, other = main.SessionLocal(), main.SessionLocal()
+    raced = []
+
+    def racing_insert(session, flush_context, instances):
+        # Another worker stores the same (user, day) between our read and our insert
+        if raced:
+            return
+        raced.append(True)
+        other.add(AvailabilityDay(user_id=user_id, date=day, busy=b"\xff" * 180))
+        other.commit()
+
+    event.listen(db, "before_flush", racing_insert)
+    try:
+        assert main.rebuild_availability(db, user_id, [day]) == {day: 0}
+    finally:
+        db.close()
+        other.close()
+
+    check = main.SessionLocal()
+    try:
+        row = check.query(AvailabilityDay).filter(AvailabilityDay.user_id == user_id).one()
+        assert from_bytes(row.busy) == 0
+    finally:
+        check.close()
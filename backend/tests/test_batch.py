@@ -0,0 +1,107 @@
+import json
+import uuid
+from datetime import date, timedelta
+
+from backend.core import main
+from backend.services.llm_router import LLMRouter
+from backend.services.rate_limit import InMemoryRateLimiter, LLMBudget
+
+
+class ScriptedProvider:
+    """Answers with the response scripted for the first task name found in the prompt."""
+
+    name = "scripted"
+
+    def __init__(self, answers: dict):
+        self.answers = answers
+
+    async def generate(self, system_instruction, messages, temperature):
+        for task_name, response_text in self.answers.items():
+            if f'"name": "{task_name}"' in messages[0]:
+                return {"response_text": response_text, "total_tokens": 100}
+        return {"response_text": "[]", "total_tokens": 100}
+
+
+def schedule_text(task_id: str, task_name: str) -> str:
+    day = date.today() + timedelta(days=7)
+    return json.dumps([{
+        "task_id": task_id, "task_name": task_name, "start_time": "09:00", "end_time": "09:25",
+        "priority": "High", "day": day.strftime("%A"), "date": day.isoformat(), "notes": None,
+    }])
+
+
+def batch_input(*task_names):
+    return {"schedules": [{
+        "tasks": [{"name": task_name, "duration_minutes": 25, "priority": "High"}],
+        "constraints": {}, "start_hour_day": "09:00", "end_hour_day": "17:00",
+    } for task_name in task_names]}
+
+
+def use_answers(monkeypatch, answers):
+    monkeypatch.setattr(main, "llm_router", LLMRouter([ScriptedProvider(answers)]))
+
+
+def test_failed_items_do_not_fail_the_batch(client, headers, monkeypatch):
+    use_answers(monkeypatch, {
+        "Gym": schedule_text(str(uuid.uuid4()), "Gym"),
+        "NotAList": "{}",
+        "Incomplete": json.dumps([{"task_name": "Incomplete"}]),
+    })
+
+    response = client.post("/schedules/batch", json=batch_input("Gym", "NotAList", "Incomplete"), headers=headers)
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["ok", "error", "error"]
+    assert "valid schedule" in results[1]["error"]
+    assert results[2]["error"].startswith("Invalid schedule")
+    saved = client.get(f"/schedule/{results[0]['schedule_id']}", headers=headers)
+    assert saved.json()["schedule"][0]["task_name"] == "Gym"
+
+
+def test_duplicate_task_ids_are_reassigned(client, headers, monkeypatch):
+    task_id = str(uuid.uuid4())
+    use_answers(monkeypatch, {"Read": schedule_text(task_id, "Read"), "Write": schedule_text(task_id, "Write")})
+
+    results = client.post("/schedules/batch", json=batch_input("Read", "Write"), headers=headers).json()["results"]
+
+    assert [result["status"] for result in results] == ["ok", "ok"]
+    task_ids = [result["schedule"][0]["task_id"] for result in results]
+    assert task_id in task_ids and len(set(task_ids)) == 2
+    for result in results:
+        assert client.get(f"/schedule/{result['schedule_id']}", headers=headers).status_code == 200
+
+
+def test_batch_is_charged_against_the_schedule_create_limit(client, headers, monkeypatch):
+    use_answers(monkeypatch, {})
+    capacity, _ = main.RATE_LIMITS["schedule:create"]
+
+    too_big = client.post("/schedules/batch", json=batch_input(*["Task"] * (capacity + 1)), headers=headers)
+    assert too_big.status_code == 400
+
+    assert client.post("/schedules/batch", json=batch_input(*["Task"] * (capacity - 1)), headers=headers).status_code == 200
+    # Only one schedule:create token is left, so a 2-item batch is refused
+    limited = client.post("/schedules/batch", json=batch_input("Task", "Task"), headers=headers)
+    assert limited.status_code == 429
+    assert "Retry-After" in limited.headers
+
+
+def test_empty_answer_is_an_error(client, headers, monkeypatch):
+    use_answers(monkeypatch, {"Nothing": "[]"})
+
+    results = client.post("/schedules/batch", json=batch_input("Nothing"), headers=headers).json()["results"]
+
+    assert results[0]["status"] == "error"
+    assert "empty schedule" in results[0]["error"]
+
+
+def test_budget_is_rechecked_per_item(client, headers, monkeypatch):
+    use_answers(monkeypatch, {"One": schedule_text(str(uuid.uuid4()), "One"), "Two": schedule_text(str(uuid.uuid4()), "Two")})
+    monkeypatch.setattr(main, "BATCH_CONCURRENCY", 1)
+    monkeypatch.setattr(main, "llm_budget", LLMBudget(InMemoryRateLimiter(), daily_tokens=100,
+                                                      daily_cost_usd=0, cost_per_1k_tokens_usd=0))
+
+    results = client.post("/schedules/batch", json=batch_input("One", "Two"), headers=headers).json()["results"]
+
+    assert [result["status"] for result in results] == ["ok", "error"]
+    assert results[1]["error"] == "Daily LLM budget exhausted"
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from backend.services.events import EventHub, TooManyConnections, event_stream
+
+
+async def never_disconnected():
+    return False
+
+
+def test_connection_limits():
+    async def scenario():
+        hub = EventHub(max_per_user=2, max_connections=3)
+        first = hub.subscribe("user-1")
+        hub.subscribe("user-1")
+        with pytest.raises(TooManyConnections):
+            hub.subscribe("user-1")
+        hub.subscribe("user-2")
+        with pytest.raises(TooManyConnections):
+            hub.subscribe("user-3")
+        hub.unsubscribe(first)
+        hub.subscribe("user-3")
+
+    asyncio.run(scenario())
+
+
+def test_events_reach_only_their_user_and_heartbeat():
+    async def scenario():
+        hub = EventHub()
+        subscription = hub.subscribe("user-1")
+        other = hub.subscribe("user-2")
+        stream = event_stream(hub, subscription, never_disconnected, heartbeat=0.01)
+        assert await stream.__anext__() == "retry: 5000\n\n"
+        assert await stream.__anext__() == ": ping\n\n"
+        hub.dispatch("user-1", {"type": "task.updated", "schedule_id": "s1"})
+        chunk = await stream.__anext__()
+        assert chunk.startswith("event: task.updated\ndata: ")
+        assert other.queue.empty()
+        await stream.aclose()
+        assert "user-1" not in hub.subscribers
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_is_dropped():
+    async def scenario():
+        hub = EventHub(max_queue=2)
+        subscription = hub.subscribe("user-1")
+        for _ in range(3):
+            hub.dispatch("user-1", {"type": "schedule.updated"})
+        assert subscription.closed
+        assert hub.connection_count() == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,20 @@
+from backend.core import main
+
+
+def test_ticket_requires_a_token(client):
+    assert client.post("/events/ticket").status_code == 401
+
+
+def test_tickets_are_single_use(client, headers):
+    ticket = client.post("/events/ticket", headers=headers).json()["ticket"]
+    user_id = client.get("/users/me", headers=headers).json()["id"]
+
+    assert main.redeem_events_ticket(ticket) == user_id
+    assert main.redeem_events_ticket(ticket) is None
+    assert client.get("/events", params={"ticket": ticket}).status_code == 401
+
+
+def test_events_reject_unknown_tickets_and_url_tokens(client, headers):
+    assert client.get("/events", params={"ticket": "made-up"}).status_code == 401
+    token = headers["Authorization"].split(" ", 1)[1]
+    assert client.get("/events", params={"token": token}).status_code == 401
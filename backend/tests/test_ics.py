@@ -0,0 +1,91 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from backend.services.ics import fold, stream_calendar
+from backend.services.recurrence import occurrence_dates
+
+STAMP = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def task(task_id, start_time, end_time, name="Focus", day=date(2024, 5, 6)):
+    return SimpleNamespace(id=task_id, date=day, start_time=start_time, end_time=end_time,
+                           name=name, priority="High", notes=None)
+
+
+def rule(rule_id, start_time="10:00", end_time="10:15", **overrides):
+    fields = dict(frequency="weekly", interval=1, weekdays="Monday,Wednesday", start_date=date(2024, 5, 1), end_date=None)
+    fields.update(overrides)
+    return SimpleNamespace(id=rule_id, **fields, start_time=start_time, end_time=end_time, name="Standup",
+                           priority="High", notes=None)
+
+
+def exception(on, start_time=None, cancelled=False):
+    return SimpleNamespace(date=on, cancelled=cancelled, start_time=start_time, end_time=None,
+                           name=None, priority=None, notes=None)
+
+
+def feed(tasks=(), rules=(), exceptions=None) -> str:
+    return "".join(stream_calendar(tasks, rules, exceptions or {}, STAMP))
+
+
+def physical_lines(text: str):
+    return [line.encode("utf-8") for line in text.split("\r\n") if line]
+
+
+def test_fold_keeps_every_line_within_75_octets():
+    for length in range(70, 240):
+        lines = physical_lines(fold("x" * length))
+        assert max(len(line) for line in lines) <= 75
+        assert b"".join(line[1:] if index else line for index, line in enumerate(lines)) == b"x" * length
+
+
+def test_fold_never_splits_multibyte_characters():
+    lines = physical_lines(fold("SUMMARY:" + "ש" * 80))
+    assert max(len(line) for line in lines) <= 75
+    for line in lines:
+        line.decode("utf-8")
+
+
+def test_tasks_become_floating_local_events():
+    text = feed([task("t1", "09:00", "09:25")])
+    assert text.startswith("BEGIN:VCALENDAR\r\n") and text.endswith("END:VCALENDAR\r\n")
+    assert "DTSTART:20240506T090000\r\n" in text
+    assert "DTEND:20240506T092500\r\n" in text
+
+
+def test_unparsable_task_times_are_skipped():
+    text = feed([task("bad", "2024-05-06T09:00:00+00:00", "9am"), task("good", "11:00", "11:25")])
+    assert text.count("BEGIN:VEVENT") == 1
+    assert "UID:good@masterminutes" in text
+
+
+def test_recurrence_with_exdate_and_override():
+    exceptions = {"r1": [exception(date(2024, 5, 6), cancelled=True), exception(date(2024, 5, 8), start_time="11:00")]}
+    text = feed(rules=[rule("r1")], exceptions=exceptions)
+    assert "RRULE:FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,WE\r\n" in text
+    assert "EXDATE:20240506T100000\r\n" in text
+    assert "RECURRENCE-ID:20240508T100000\r\n" in text
+    assert "DTSTART:20240508T110000\r\n" in text
+
+
+def test_unparsable_rules_and_overrides_are_skipped():
+    exceptions = {"good": [exception(date(2024, 5, 8), start_time="late")]}
+    text = feed(rules=[rule("bad", start_time="7pm"), rule("good")], exceptions=exceptions)
+    assert text.count("BEGIN:VEVENT") == 1
+    assert "UID:good@masterminutes" in text
+    assert "RECURRENCE-ID" not in text
+
+
+def test_biweekly_rule_starts_on_the_same_occurrence_as_the_api():
+    # 2024-05-05 is a Sunday: its week is week 0, so the first Monday occurrence is 05-13, not 05-06
+    biweekly = rule("r1", interval=2, weekdays="Monday", start_date=date(2024, 5, 5))
+    assert next(occurrence_dates(biweekly, date(2024, 5, 5), date(2024, 6, 30))) == date(2024, 5, 13)
+
+    text = feed(rules=[biweekly])
+    assert "DTSTART:20240513T100000\r\n" in text
+    assert "RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=MO\r\n" in text
+
+
+def test_rule_ending_before_its_first_occurrence_is_skipped():
+    text = feed(rules=[rule("r1", weekdays="Monday", start_date=date(2024, 5, 7), end_date=date(2024, 5, 10))])
+    assert "BEGIN:VEVENT" not in text
@@ -0,0 +1,22 @@
+from backend.core import main
+from backend.services.llm_router import FakeProvider, LLMRouter
+
+QUERY = {"messages": [{"role": "user", "parts": [{"text": "plan my day"}]}], "model": "test", "temperature": 1}
+
+
+def test_llm_query_requires_a_token(client):
+    assert client.post("/gemini/query", json=QUERY).status_code == 401
+
+
+def test_llm_query_is_rate_limited(client, headers, monkeypatch):
+    monkeypatch.setattr(main, "llm_router", LLMRouter([FakeProvider("fake", response_text="[]")]))
+    capacity, _ = main.RATE_LIMITS["llm:query"]
+
+    for _ in range(capacity):
+        response = client.post("/gemini/query", json=QUERY, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["response_text"] == "[]"
+
+    limited = client.post("/gemini/query", json=QUERY, headers=headers)
+    assert limited.status_code == 429
+    assert "Retry-After" in limited.headers
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.services.llm_recorder import RecordingProvider, RecordingStore, ReplayProvider, fingerprint
+from backend.services.llm_router import FakeProvider, LLMRouter, ProviderError
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_recorded_call_replays_identically(tmp_path):
+    path = str(tmp_path / "recordings.jsonl")
+    live = FakeProvider("gemini", response_text='[{"task_name": "Gym"}]', latency=0.05)
+    recorded = run(LLMRouter([RecordingProvider(live, RecordingStore(path))]).generate("today is 2024-05-01", ["plan"]))
+
+    # A fresh store reads the file back, as a new process would
+    replay = ReplayProvider(RecordingStore(path))
+    replayed = run(LLMRouter([replay]).generate("today is 2024-05-01", ["plan"]))
+
+    assert replayed["response_text"] == recorded["response_text"]
+    assert live.calls == 1
+
+
+def test_replay_latency_modes(tmp_path, monkeypatch):
+    store = RecordingStore(str(tmp_path / "recordings.jsonl"))
+    run(RecordingProvider(FakeProvider("gemini", latency=0.05), store).generate("system", ["hi"], 1.0))
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    run(ReplayProvider(store, latency="zero").generate("system", ["hi"], 1.0))
+    assert sleeps == []
+    run(ReplayProvider(store, latency="original").generate("system", ["hi"], 1.0))
+    assert len(sleeps) == 1 and sleeps[0] >= 0.04
+
+
+def test_answers_failing_validation_are_not_recorded(tmp_path):
+    def is_json(text):
+        try:
+            json.loads(text)
+            return True
+        except ValueError:
+            return False
+
+    store = RecordingStore(str(tmp_path / "recordings.jsonl"))
+    broken = RecordingProvider(FakeProvider("broken", response_text="not json"), store, validate=is_json)
+    good = RecordingProvider(FakeProvider("good", response_text="[]"), store, validate=is_json)
+
+    result = run(LLMRouter([broken, good], hedge_delay=0.5).generate("system", ["hi"], validate=is_json))
+
+    assert result["provider"] == "good"
+    assert len(store) == 1
+    assert len(RecordingStore(store.path)) == 1
+
+
+def test_prompt_date_does_not_change_fingerprint():
+    assert fingerprint("today is 2024-05-01", ["plan"], 1.0) == fingerprint("today is 2025-01-31", ["plan"], 1.0)
+    assert fingerprint("today is 2024-05-01", ["plan"], 1.0) != fingerprint("today is 2024-05-01", ["other"], 1.0)
+
+
+def test_repeated_recordings_replay_in_order(tmp_path):
+    store = RecordingStore(str(tmp_path / "recordings.jsonl"))
+    for text in ("first", "second"):
+        run(RecordingProvider(FakeProvider("gemini", response_text=text), store).generate("system", ["hi"], 1.0))
+
+    replay = ReplayProvider(store)
+    answers = [run(replay.generate("system", ["hi"], 1.0))["response_text"] for _ in range(3)]
+    assert answers == ["first", "second", "first"]
+
+
+def test_missing_recording_raises(tmp_path):
+    replay = ReplayProvider(RecordingStore(str(tmp_path / "empty.jsonl")))
+    with pytest.raises(ProviderError):
+        run(replay.generate("system", ["never recorded"], 1.0))
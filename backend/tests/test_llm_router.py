@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.services.llm_router import AllProvidersFailed, FakeProvider, LLMRouter
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    slow = FakeProvider("slow", response_text='["slow"]', latency=1.0)
+    fast = FakeProvider("fast", response_text='["fast"]', latency=0.01)
+    router = LLMRouter([slow, fast], hedge_delay=0.05)
+
+    result = run(router.generate("system", ["hi"]))
+
+    assert result["provider"] == "fast"
+    assert result["response_text"] == '["fast"]'
+    assert slow.cancelled == 1
+
+
+def test_slowed_down_primary_loses_its_rank():
+    primary = FakeProvider("primary", latency=1.0)
+    backup = FakeProvider("backup", latency=0.0)
+    router = LLMRouter([primary, backup], hedge_delay=0.05)
+    # History from when the primary was still the fastest
+    for _ in range(2):
+        router.stats["primary"].record_success(0.01)
+        router.stats["backup"].record_success(0.02)
+
+    for _ in range(3):
+        assert run(router.generate("system", ["hi"]))["provider"] == "backup"
+
+    # Each cancelled call counts as at least the hedge delay, so the primary drops behind
+    assert [provider.name for provider in router.ranked()] == ["backup", "primary"]
+    assert primary.calls == 2
+
+
+def test_fast_primary_is_not_hedged():
+    primary = FakeProvider("primary", latency=0.0)
+    backup = FakeProvider("backup", latency=0.0)
+    router = LLMRouter([primary, backup], hedge_delay=0.5)
+
+    assert run(router.generate("system", ["hi"]))["provider"] == "primary"
+    assert backup.calls == 0
+
+
+def test_fails_over_and_demotes_failing_provider():
+    down = FakeProvider("down", fail=True)
+    up = FakeProvider("up", latency=0.0)
+    router = LLMRouter([down, up], hedge_delay=0.5)
+
+    assert run(router.generate("system", ["hi"]))["provider"] == "up"
+    # The failing provider is now ranked last and no longer tried first
+    assert [provider.name for provider in router.ranked()] == ["up", "down"]
+    run(router.generate("system", ["hi"]))
+    assert down.calls == 1
+
+
+def test_circuit_opens_after_consecutive_failures():
+    now = [0.0]
+    flaky = FakeProvider("flaky", fail=True)
+    router = LLMRouter([flaky, FakeProvider("backup")], failure_threshold=2, cooldown=30, clock=lambda: now[0])
+    for _ in range(2):
+        router.stats["flaky"].record_success(0.1)
+    for _ in range(2):
+        with pytest.raises(Exception):
+            run(router._call(flaky, None, "system", ["hi"], 1.0))
+    assert router.snapshot()["flaky"]["circuit_open"]
+    assert not router.healthy(flaky)
+    now[0] = 31.0
+    assert router.healthy(flaky)
+
+
+def test_invalid_result_fails_over():
+    broken = FakeProvider("broken", response_text="not json")
+    good = FakeProvider("good", response_text="[]")
+
+    def is_json(text):
+        try:
+            json.loads(text)
+            return True
+        except ValueError:
+            return False
+
+    router = LLMRouter([broken, good], hedge_delay=0.5)
+    assert run(router.generate("system", ["hi"], validate=is_json))["provider"] == "good"
+
+
+def test_all_providers_failing_raises():
+    router = LLMRouter([FakeProvider("a", fail=True), FakeProvider("b", fail=True)], hedge_delay=0.5)
+    with pytest.raises(AllProvidersFailed):
+        run(router.generate("system", ["hi"]))
+
+
+def test_ranking_prefers_lower_latency():
+    slow = FakeProvider("slow")
+    fast = FakeProvider("fast")
+    router = LLMRouter([slow, fast])
+    for _ in range(5):
+        router.stats["slow"].record_success(2.0)
+        router.stats["fast"].record_success(0.5)
+    assert router.ranked()[0] is fast
+    assert router.hedge_after(fast) == 0.5
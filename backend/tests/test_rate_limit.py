@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from backend.services.rate_limit import InMemoryRateLimiter, LLMBudget, parse_rate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_rate():
+    assert parse_rate("5/60") == (5, 5 / 60)
+
+
+def test_bucket_allows_burst_then_reports_retry_after():
+    clock = FakeClock()
+    limiter = InMemoryRateLimiter(clock)
+    capacity, rate = parse_rate("3/60")
+    assert [limiter.take("user-1", capacity, rate) for _ in range(3)] == [0, 0, 0]
+    assert limiter.take("user-1", capacity, rate) == 20.0
+    # Other users and endpoints have their own buckets
+    assert limiter.take("user-2", capacity, rate) == 0
+
+    clock.now = 20.0
+    assert limiter.take("user-1", capacity, rate) == 0
+    assert limiter.take("user-1", capacity, rate) > 0
+
+
+def test_bucket_never_refills_past_capacity():
+    clock = FakeClock()
+    limiter = InMemoryRateLimiter(clock)
+    limiter.take("user-1", 2, 1.0)
+    clock.now = 1000.0
+    assert [limiter.take("user-1", 2, 1.0) > 0 for _ in range(3)] == [False, False, True]
+
+
+def test_llm_budget_blocks_until_next_day():
+    budget = LLMBudget(InMemoryRateLimiter(), daily_tokens=1000, daily_cost_usd=0, cost_per_1k_tokens_usd=0.001)
+    now = datetime(2025, 3, 3, 23, 0, 0)
+    assert budget.check("user-1", now) == 0
+    budget.record("user-1", 1200, now)
+    assert budget.check("user-1", now) == 3600
+    assert budget.check("user-2", now) == 0
+    assert budget.check("user-1", datetime(2025, 3, 4, 0, 0, 1)) == 0
+
+
+def test_llm_cost_budget():
+    budget = LLMBudget(InMemoryRateLimiter(), daily_tokens=0, daily_cost_usd=0.01, cost_per_1k_tokens_usd=0.005)
+    now = datetime(2025, 3, 3, 12, 0, 0)
+    budget.record("user-1", 1000, now)
+    assert budget.check("user-1", now) == 0
+    budget.record("user-1", 1000, now)
+    assert budget.check("user-1", now) > 0
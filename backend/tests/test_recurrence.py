@@ -0,0 +1,78 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services.recurrence import expand_rules, is_hhmm, occurrence_dates, parse_window
+
+
+def make_rule(**overrides):
+    rule = dict(
+        id="rule-1",
+        name="Standup",
+        start_time="09:00",
+        end_time="09:15",
+        priority="High",
+        notes=None,
+        frequency="weekly",
+        interval=1,
+        weekdays="Monday,Wednesday",
+        start_date=date(2025, 3, 3),  # a Monday
+        end_date=None,
+    )
+    rule.update(overrides)
+    return SimpleNamespace(**rule)
+
+
+def test_weekly_rule_expands_only_requested_window():
+    rule = make_rule()
+    days = list(occurrence_dates(rule, date(2025, 3, 1), date(2025, 3, 14)))
+    assert days == [date(2025, 3, 3), date(2025, 3, 5), date(2025, 3, 10), date(2025, 3, 12)]
+
+
+def test_every_other_week_and_end_date():
+    rule = make_rule(interval=2, end_date=date(2025, 3, 31))
+    days = list(occurrence_dates(rule, date(2025, 3, 1), date(2025, 12, 31)))
+    assert days == [date(2025, 3, 3), date(2025, 3, 5), date(2025, 3, 17), date(2025, 3, 19),
+                    date(2025, 3, 31)]
+
+
+def test_daily_rule_with_interval_starts_on_matching_day():
+    rule = make_rule(frequency="daily", interval=3, weekdays=None)
+    days = list(occurrence_dates(rule, date(2025, 3, 4), date(2025, 3, 12)))
+    assert days == [date(2025, 3, 6), date(2025, 3, 9), date(2025, 3, 12)]
+
+
+def test_exceptions_cancel_and_override_occurrences():
+    rule = make_rule()
+    exceptions = {
+        ("rule-1", date(2025, 3, 3)): SimpleNamespace(cancelled=True, name=None, start_time=None,
+                                                      end_time=None, priority=None, notes=None),
+        ("rule-1", date(2025, 3, 5)): SimpleNamespace(cancelled=False, name=None, start_time="10:00",
+                                                      end_time="10:15", priority=None, notes="moved"),
+    }
+    items = list(expand_rules([rule], date(2025, 3, 3), date(2025, 3, 5), exceptions))
+    assert len(items) == 1
+    assert items[0]["task_id"] == "rule-1_2025-03-05"
+    assert items[0]["start_time"] == "10:00"
+    assert items[0]["notes"] == "moved"
+    assert items[0]["day"] == "Wednesday"
+
+
+def test_rules_are_merged_in_time_order():
+    early = make_rule(id="a", start_time="08:00", weekdays="Wednesday")
+    late = make_rule(id="b", start_time="07:00", weekdays="Monday")
+    items = list(expand_rules([early, late], date(2025, 3, 3), date(2025, 3, 5)))
+    assert [item["task_id"] for item in items] == ["b_2025-03-03", "a_2025-03-05"]
+
+
+def test_window_is_bounded():
+    assert parse_window("2025-03-01", "2025-03-07") == (date(2025, 3, 1), date(2025, 3, 7))
+    with pytest.raises(ValueError):
+        parse_window("2025-01-01", "2027-01-01")
+
+
+def test_is_hhmm_accepts_only_zero_padded_24h_times():
+    assert is_hhmm("00:00") and is_hhmm("09:05") and is_hhmm("23:59")
+    for value in ("7pm", "9:05", "24:00", "12:60", "09:00:00", "2025-03-03T09:00", "", None):
+        assert not is_hhmm(value)
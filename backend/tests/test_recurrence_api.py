@@ -0,0 +1,87 @@
+import uuid
+from datetime import date, timedelta
+
+from backend.core import main
+from backend.db.moudles import Schedule
+
+START = date.today() + timedelta(days=1)
+WINDOW = {"start": START.isoformat(), "end": (START + timedelta(days=2)).isoformat()}
+
+
+def make_schedule(client, headers) -> str:
+    user_id = client.get("/users/me", headers=headers).json()["id"]
+    schedule_id = str(uuid.uuid4())
+    db = main.SessionLocal()
+    try:
+        db.add(Schedule(id=schedule_id, user_id=user_id))
+        db.commit()
+    finally:
+        db.close()
+    return schedule_id
+
+
+def rule_body(**overrides):
+    body = {"task_name": "Standup", "start_time": "10:00", "end_time": "10:15", "priority": "High",
+            "frequency": "daily", "start_date": START.isoformat()}
+    body.update(overrides)
+    return body
+
+
+def occurrences(client, headers, schedule_id):
+    response = client.get(f"/schedule/{schedule_id}/occurrences", params=WINDOW, headers=headers)
+    return [(item["date"], item["start_time"]) for item in response.json()["schedule"]]
+
+
+def busy(client, headers):
+    days = client.get("/availability", params=WINDOW, headers=headers).json()["days"]
+    return [interval["start"] for day in days for interval in day["busy"]]
+
+
+def test_end_date_before_start_date_is_rejected(client, headers):
+    schedule_id = make_schedule(client, headers)
+    body = rule_body(end_date=(START - timedelta(days=1)).isoformat())
+    assert client.post(f"/schedule/{schedule_id}/recurrence", json=body, headers=headers).status_code == 400
+
+
+def test_update_moves_and_ends_a_rule(client, headers):
+    schedule_id = make_schedule(client, headers)
+    rule_id = client.post(f"/schedule/{schedule_id}/recurrence", json=rule_body(), headers=headers).json()["rule_id"]
+    assert busy(client, headers) == ["10:00"] * 3
+
+    response = client.put(f"/schedule/{schedule_id}/recurrence/{rule_id}", headers=headers,
+                          json=rule_body(start_time="11:00", end_time="11:30", end_date=START.isoformat()))
+
+    assert response.status_code == 200
+    assert response.json()["end_date"] == START.isoformat()
+    assert occurrences(client, headers, schedule_id) == [(START.isoformat(), "11:00")]
+    assert busy(client, headers) == ["11:00"]
+    bad = client.put(f"/schedule/{schedule_id}/recurrence/{rule_id}", json=rule_body(start_time="7pm"), headers=headers)
+    assert bad.status_code == 400
+
+
+def test_delete_removes_rule_and_its_exceptions(client, headers):
+    schedule_id = make_schedule(client, headers)
+    rule_id = client.post(f"/schedule/{schedule_id}/recurrence", json=rule_body(), headers=headers).json()["rule_id"]
+    client.put(f"/schedule/{schedule_id}/recurrence/{rule_id}/occurrence/{START.isoformat()}",
+               json={"start_time": "12:00"}, headers=headers)
+    assert busy(client, headers) == ["12:00", "10:00", "10:00"]
+
+    assert client.delete(f"/schedule/{schedule_id}/recurrence/{rule_id}", headers=headers).status_code == 200
+
+    assert client.get(f"/schedule/{schedule_id}/recurrence", headers=headers).json() == []
+    assert occurrences(client, headers, schedule_id) == []
+    assert busy(client, headers) == []
+    assert client.delete(f"/schedule/{schedule_id}/recurrence/{rule_id}", headers=headers).status_code == 404
+
+
+def test_rules_of_other_users_cannot_be_changed(client, headers):
+    schedule_id = make_schedule(client, headers)
+    rule_id = client.post(f"/schedule/{schedule_id}/recurrence", json=rule_body(), headers=headers).json()["rule_id"]
+    username = f"intruder-{uuid.uuid4().hex[:8]}"
+    client.post("/register", json={"username": username, "email": f"{username}@example.com", "password": "secret"})
+    token = client.post("/token", data={"username": username, "password": "secret"}).json()["access_token"]
+    intruder = {"Authorization": f"Bearer {token}"}
+
+    assert client.put(f"/schedule/{schedule_id}/recurrence/{rule_id}", json=rule_body(), headers=intruder).status_code == 404
+    assert client.delete(f"/schedule/{schedule_id}/recurrence/{rule_id}", headers=intruder).status_code == 404
+    assert len(client.get(f"/schedule/{schedule_id}/recurrence", headers=headers).json()) == 1
@@ -0,0 +1,52 @@
+import json
+import uuid
+from datetime import date, timedelta
+
+from backend.core import main
+from backend.services.llm_router import FakeProvider, LLMRouter
+
+SCHEDULE_INPUT = {"tasks": [{"name": "Focus", "duration_minutes": 25, "priority": "High"}],
+                  "constraints": {}, "start_hour_day": "09:00", "end_hour_day": "17:00"}
+TOMORROW = date.today() + timedelta(days=1)
+
+
+def generate(client, headers, monkeypatch, start_time, replaces=None):
+    answer = json.dumps([{
+        "task_id": str(uuid.uuid4()), "task_name": "Focus", "start_time": start_time,
+        "end_time": start_time[:3] + "25", "priority": "High", "day": TOMORROW.strftime("%A"),
+        "date": TOMORROW.isoformat(), "notes": None,
+    }])
+    monkeypatch.setattr(main, "llm_router", LLMRouter([FakeProvider("fake", response_text=answer)]))
+    params = {"replaces": replaces} if replaces else None
+    response = client.post("/schedule", json=SCHEDULE_INPUT, params=params, headers=headers)
+    assert response.status_code == 200
+    return response.json()["schedule_id"]
+
+
+def test_recurrence_rules_move_to_the_regenerated_schedule(client, headers, monkeypatch):
+    old_id = generate(client, headers, monkeypatch, "09:00")
+    rule = client.post(f"/schedule/{old_id}/recurrence", headers=headers, json={
+        "task_name": "Standup", "start_time": "10:00", "end_time": "10:15", "priority": "High",
+        "frequency": "daily", "start_date": date.today().isoformat(),
+    }).json()
+
+    new_id = generate(client, headers, monkeypatch, "13:00", replaces=old_id)
+
+    moved = client.get(f"/schedule/{new_id}/recurrence", headers=headers).json()
+    assert [(item["rule_id"], item["end_date"]) for item in moved] == [(rule["rule_id"], None)]
+    assert client.get(f"/schedule/{old_id}/recurrence", headers=headers).json() == []
+
+
+def test_replaced_schedule_leaves_availability_and_feed_right_away(client, headers, monkeypatch):
+    old_id = generate(client, headers, monkeypatch, "09:00")
+    feed = client.post("/calendar/feed", headers=headers).json()["feed_url"].replace("http://testserver", "")
+    window = {"start": TOMORROW.isoformat(), "end": TOMORROW.isoformat()}
+    assert client.get("/availability", params=window, headers=headers).json()["days"][0]["busy"][0]["start"] == "09:00"
+
+    generate(client, headers, monkeypatch, "13:00", replaces=old_id)
+
+    busy = client.get("/availability", params=window, headers=headers).json()["days"][0]["busy"]
+    assert busy == [{"start": "13:00", "end": "13:25"}]
+    calendar = client.get(feed).text
+    assert calendar.count("BEGIN:VEVENT") == 1
+    assert f"DTSTART:{TOMORROW.strftime('%Y%m%d')}T130000" in calendar
@@ -0,0 +1,66 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from backend.services.reminders import PARTITIONS, desired_partitions, due_occurrences, partition_for, reminder_key
+
+
+def test_partition_is_stable_and_in_range():
+    assert partition_for("user-1") == partition_for("user-1")
+    assert all(0 <= partition_for(f"user-{i}") < PARTITIONS for i in range(1000))
+
+
+def test_workers_split_partitions_without_overlap():
+    workers = ["worker-c", "worker-a", "worker-b"]
+    shares = [desired_partitions(worker, workers) for worker in workers]
+    assert set().union(*shares) == set(range(PARTITIONS))
+    assert sum(len(share) for share in shares) == PARTITIONS
+
+
+def test_joining_worker_only_takes_a_slice():
+    before = desired_partitions("worker-a", ["worker-a", "worker-b"])
+    after = desired_partitions("worker-a", ["worker-a", "worker-b", "worker-c"])
+    assert after <= before
+
+
+def test_worker_not_yet_registered_still_gets_a_share():
+    assert desired_partitions("worker-new", []) == set(range(PARTITIONS))
+
+
+def test_reminder_key_changes_when_task_moves():
+    task = SimpleNamespace(id="t1", date=date(2025, 3, 3), start_time="09:00")
+    moved = SimpleNamespace(id="t1", date=date(2025, 3, 3), start_time="10:00")
+    assert reminder_key(task) != reminder_key(moved)
+
+
+def make_rule(**overrides):
+    fields = dict(id="rule-1", schedule_id="schedule-1", name="Standup", start_time="09:00", end_time="09:15",
+                  priority="High", notes=None, frequency="daily", interval=1, weekdays=None,
+                  start_date=date(2025, 3, 1), end_date=None)
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+def test_recurring_occurrences_inside_the_lead_window_are_due():
+    now = datetime(2025, 3, 3, 8, 52)
+    due = due_occurrences([make_rule(), make_rule(id="rule-2", start_time="11:00")], {}, now, now + timedelta(minutes=10))
+
+    assert [(item.id, item.date, item.start_time) for item in due] == [("rule-1_2025-03-03", date(2025, 3, 3), "09:00")]
+    assert reminder_key(due[0]) != reminder_key(SimpleNamespace(id="rule-1_2025-03-04", date=date(2025, 3, 4),
+                                                                start_time="09:00"))
+
+
+def test_moved_and_cancelled_occurrences():
+    now = datetime(2025, 3, 3, 9, 52)
+    moved = SimpleNamespace(cancelled=False, name=None, start_time="10:00", end_time="10:15", priority=None, notes=None)
+    assert [item.start_time for item in due_occurrences([make_rule()], {("rule-1", date(2025, 3, 3)): moved},
+                                                        now, now + timedelta(minutes=10))] == ["10:00"]
+
+    cancelled = SimpleNamespace(cancelled=True)
+    assert due_occurrences([make_rule(start_time="10:00")], {("rule-1", date(2025, 3, 3)): cancelled},
+                           now, now + timedelta(minutes=10)) == []
+
+
+def test_occurrences_across_midnight():
+    now = datetime(2025, 3, 3, 23, 55)
+    due = due_occurrences([make_rule(start_time="00:02")], {}, now, now + timedelta(minutes=10))
+    assert [item.date for item in due] == [date(2025, 3, 4)]
@@ -0,0 +1,103 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.db.moudles import ArchivedSchedule, Base, Schedule, ScheduleRevision, Task
+from backend.services.retention import (archive_schedule, archived_items, archived_tasks, find_candidates,
+                                        load_archived_payload)
+
+TODAY = date(2025, 6, 1)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def add_schedule(db, schedule_id, days, user_id="user-1", start_time="09:00"):
+    db.add(Schedule(id=schedule_id, user_id=user_id))
+    for index, day in enumerate(days):
+        db.add(Task(id=f"{schedule_id}-{index}-{start_time}", schedule_id=schedule_id, name=f"Task {index}",
+                    start_time=start_time, end_time="09:25", priority="High", date=day))
+    db.commit()
+
+
+def test_find_candidates_prefers_superseded_then_past(db):
+    add_schedule(db, "past", [TODAY - timedelta(days=40)])
+    add_schedule(db, "recent", [TODAY - timedelta(days=5)])
+    add_schedule(db, "old-revision", [TODAY + timedelta(days=3)])
+    add_schedule(db, "new-revision", [TODAY + timedelta(days=3)])
+    add_schedule(db, "just-replaced", [TODAY + timedelta(days=3)])
+    db.add(ScheduleRevision(schedule_id="old-revision", replaced_by="new-revision",
+                            replaced_at=datetime.utcnow() - timedelta(days=2)))
+    db.add(ScheduleRevision(schedule_id="just-replaced", replaced_by="new-revision", replaced_at=datetime.utcnow()))
+    db.commit()
+
+    candidates = find_candidates(db, retention_days=30, superseded_grace=timedelta(days=1), limit=10, today=TODAY)
+
+    assert candidates == ["old-revision", "past"]
+    assert find_candidates(db, 30, timedelta(days=1), limit=1, today=TODAY) == ["old-revision"]
+
+
+def test_archive_schedule_moves_tasks_into_one_row(db):
+    days = [TODAY - timedelta(days=40), TODAY - timedelta(days=41)]
+    add_schedule(db, "past", days)
+
+    archive = archive_schedule(db, "past")
+
+    assert archive.task_count == 2
+    assert (archive.first_date, archive.last_date) == (days[1], days[0])
+    assert db.query(Task).filter(Task.schedule_id == "past").count() == 0
+    payload = load_archived_payload(db, "past")
+    assert [item["date"] for item in payload["schedule"]] == sorted(day.isoformat() for day in days)
+    assert archive_schedule(db, "past") is None
+
+
+def test_archive_merges_into_existing_blob(db):
+    add_schedule(db, "past", [TODAY - timedelta(days=40)])
+    archive_schedule(db, "past")
+    db.add(Task(id="late", schedule_id="past", name="Late", start_time="08:00", end_time="08:25",
+                priority="Low", date=TODAY - timedelta(days=45)))
+    db.commit()
+
+    archive = archive_schedule(db, "past")
+
+    assert archive.task_count == 2
+    assert db.query(ArchivedSchedule).count() == 1
+    assert [item["task_id"] for item in load_archived_payload(db, "past")["schedule"]] == ["late", "past-0-09:00"]
+
+
+def test_load_archived_payload_of_unknown_schedule(db):
+    assert load_archived_payload(db, "missing") is None
+    assert archived_items(db, "missing", TODAY, TODAY) == []
+
+
+def test_archived_items_are_filtered_to_the_window(db):
+    add_schedule(db, "past", [TODAY - timedelta(days=days_ago) for days_ago in (40, 35, 31)])
+    archive_schedule(db, "past")
+
+    items = archived_items(db, "past", TODAY - timedelta(days=36), TODAY - timedelta(days=31))
+
+    assert [item["date"] for item in items] == [(TODAY - timedelta(days=35)).isoformat(),
+                                                 (TODAY - timedelta(days=31)).isoformat()]
+
+
+def test_superseded_archives_keep_only_days_before_the_replacement(db):
+    replaced_at = datetime(2025, 6, 1, 12, 0)
+    add_schedule(db, "kept", [date(2025, 4, 1)])
+    add_schedule(db, "old", [date(2025, 5, 30), date(2025, 6, 2)])
+    db.add(ScheduleRevision(schedule_id="old", replaced_by="kept", replaced_at=replaced_at))
+    db.commit()
+    archive_schedule(db, "kept")
+    archive_schedule(db, "old")
+
+    tasks = sorted(archived_tasks(db, "user-1"), key=lambda task: task.date)
+
+    assert [(task.schedule_id, task.date) for task in tasks] == [("kept", date(2025, 4, 1)), ("old", date(2025, 5, 30))]
+    assert list(archived_tasks(db, "someone-else")) == []
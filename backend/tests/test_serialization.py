@@ -0,0 +1,55 @@
+import gzip
+
+from backend.services import serialization
+from backend.services.serialization import (
+    COLUMNAR,
+    JSON,
+    compress,
+    encode_payload,
+    from_columnar,
+    loads,
+    negotiate_encoding,
+    negotiate_format,
+    to_columnar,
+)
+
+PAYLOAD = {
+    "schedule_id": "abc",
+    "notes": None,
+    "schedule": [
+        {"task_id": str(i), "task_name": "Focus" if i % 2 else "Short Break", "start_time": "09:00",
+         "end_time": "09:25", "priority": "High", "day": "Monday", "date": "2025-03-03", "notes": None}
+        for i in range(100)
+    ],
+}
+
+
+def test_columnar_round_trip_and_dictionary_encoding():
+    columnar = to_columnar(PAYLOAD)
+    assert columnar["dictionaries"]["priority"] == ["High"]
+    assert set(columnar["columns"]["priority"]) == {0}
+    assert from_columnar(loads(encode_payload(PAYLOAD, COLUMNAR))) == PAYLOAD
+
+
+def test_columnar_is_smaller_than_json():
+    assert len(encode_payload(PAYLOAD, COLUMNAR)) < len(encode_payload(PAYLOAD, JSON))
+
+
+def test_negotiation_defaults_to_json_and_respects_q(monkeypatch):
+    assert negotiate_format(None) == JSON
+    assert negotiate_format("*/*") == JSON
+    assert negotiate_format(f"{JSON};q=0.5, {COLUMNAR}") == COLUMNAR
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    monkeypatch.setattr(serialization, "available_encodings", lambda: ("br", "gzip"))
+    assert negotiate_encoding("gzip;q=1, br;q=0.1") == "gzip"
+    assert negotiate_encoding("gzip;q=0.5, br;q=0.5") == "br"
+
+
+def test_small_bodies_are_not_compressed():
+    assert compress(b"{}", "gzip") == (b"{}", None)
+    body = encode_payload(PAYLOAD, JSON)
+    compressed, used = compress(body, "gzip")
+    assert used == "gzip"
+    assert gzip.decompress(compressed) == body
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import TaskForm from './TaskForm';
 import TaskList from './TaskList';
 import ScheduleForm from './ScheduleForm';
@@ -73,6 +73,82 @@ const Dashboard = ({ token, setToken }) => {
     }
   };
 
+  // Subscribe to pushed schedule changes instead of re-fetching on a timer.
+  // The schedule is only re-read when the server says it changed.
+  const currentScheduleId = schedule?.schedule_id;
+  useEffect(() => {
+    if (!token || !currentScheduleId) return undefined;
+
+    const refresh = async (id) => {
+      try {
+        const response = await api.get(`/schedule/${id}`, {
+          headers: { Authorization: `Bearer ${token}` }
+        });
+        setSchedule(response.data);
+      } catch (error) {
+        console.error('Refresh schedule error:', error);
+      }
+    };
+
+    let events = null;
+    let retryTimer = null;
+    let stopped = false;
+
+    // The stream is opened with a short-lived, single-use ticket rather than the access token,
+    // which would otherwise end up in server access logs
+    const connect = async () => {
+      let ticket;
+      try {
+        const response = await api.post('/events/ticket', null, {
+          headers: { Authorization: `Bearer ${token}` }
+        });
+        ticket = response.data.ticket;
+      } catch (error) {
+        // An expired login won't get better by retrying
+        if (error.response?.status !== 401 && !stopped) {
+          retryTimer = setTimeout(connect, 5000);
+        }
+        return;
+      }
+      if (stopped) return;
+
+      events = new EventSource(`${api.defaults.baseURL}/events?ticket=${encodeURIComponent(ticket)}`);
+      const onScheduleChange = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.schedule_id === currentScheduleId) {
+          refresh(currentScheduleId);
+        }
+      };
+      events.addEventListener('task.updated', onScheduleChange);
+      events.addEventListener('schedule.updated', onScheduleChange);
+      events.addEventListener('schedule.regenerated', (event) => {
+        const data = JSON.parse(event.data);
+        if (data.replaces === currentScheduleId) {
+          toast.info('Schedule was regenerated');
+          refresh(data.schedule_id);
+        }
+      });
+      events.addEventListener('reminder.fired', (event) => {
+        const data = JSON.parse(event.data);
+        toast.info(`"${data.task_name}" starts at ${data.start_time}`);
+      });
+      events.onerror = () => {
+        // The browser would retry with the already used ticket; reconnect with a fresh one instead
+        events.close();
+        if (!stopped) {
+          retryTimer = setTimeout(connect, 5000);
+        }
+      };
+    };
+    connect();
+
+    return () => {
+      stopped = true;
+      clearTimeout(retryTimer);
+      if (events) events.close();
+    };
+  }, [token, currentScheduleId]);
+
   const handleSendScheduleToTelegram = async (scheduleId) => {
     try {
       console.log('Sending schedule to Telegram with ID:', scheduleId);